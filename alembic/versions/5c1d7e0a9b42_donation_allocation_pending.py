@@ -0,0 +1,29 @@
+"""Donation allocation pending flag
+
+Revision ID: 5c1d7e0a9b42
+Revises: 23307e049b82
+Create Date: 2026-10-18 12:05:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1d7e0a9b42'
+down_revision = '23307e049b82'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.add_column(sa.Column(
+            'allocation_pending', sa.Boolean(), nullable=False,
+            server_default=sa.false()
+        ))
+
+
+def downgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.drop_column('allocation_pending')
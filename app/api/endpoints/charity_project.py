@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import (APIRouter, Depends, File, Query, Request, Response,
+                     UploadFile)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.utils import get_project_or_404
-from app.core.db import get_async_session
+from app.api.utils import (PageParams, get_cached_response,
+                           get_export_response, get_import_rows,
+                           get_project_or_404, get_rows_response,
+                           get_schema_columns)
+from app.core.config import Constants, settings
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import current_superuser
 from app.crud.charity_project import charity_project_crud
+from app.crud.investment import investment_crud
 from app.models import CharityProject
 from app.schemas.charity_project import (CharityProjectCreate,
                                          CharityProjectDB,
                                          CharityProjectUpdate)
+from app.schemas.data_import import ImportReport
+from app.schemas.investment import InvestmentDB
 from app.services.investment_func import InvestmentService
 
 router = APIRouter()
@@ -29,16 +40,76 @@ async def create_new_charity_project(
     return await invest_object.create_object(charity_project, CharityProject)
 
 
+@router.post(
+    '/import',
+    response_model=ImportReport,
+    dependencies=[Depends(current_superuser)],
+)
+async def import_charity_projects(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(
+        None, alias='format', regex=Constants.IMPORT_FORMAT_REGEX
+    ),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """For superusers only"""
+    invest_object = InvestmentService(session)
+    return await invest_object.import_objects(
+        get_import_rows(file, file_format), CharityProject
+    )
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    dependencies=[Depends(current_superuser)]
+)
+async def export_charity_projects(
+    file_format: str = Query(
+        Constants.EXPORT_FORMAT_NDJSON,
+        alias='format',
+        regex=Constants.EXPORT_FORMAT_REGEX
+    ),
+    session: AsyncSession = Depends(get_async_read_session)
+):
+    """For superusers only"""
+    return get_export_response(
+        charity_project_crud, CharityProjectDB, file_format, 'projects',
+        session
+    )
+
+
 @router.get(
     '/',
     response_model=list[CharityProjectDB],
     response_model_exclude_none=True,
 )
 async def get_all_charity_projects(
-    session: AsyncSession = Depends(get_async_session)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+    read_session: AsyncSession = Depends(get_async_read_session)
 ):
     """For any user"""
-    return await charity_project_crud.get_multi(session)
+    # A cached page lives until the next write, so it is never filled
+    # from a lagging replica.
+    if not settings.response_cache_enabled:
+        session = read_session
+
+    async def get_rows(response: Response) -> list:
+        return page.set_next_page(
+            await charity_project_crud.get_page(
+                session, page.fetch_limit, page.after,
+                column_names=get_schema_columns(CharityProjectDB)
+            ),
+            request,
+            response
+        )
+
+    if settings.response_cache_enabled:
+        return await get_cached_response(request, get_rows)
+    return get_rows_response(await get_rows(response), response)
 
 
 @router.patch(
@@ -72,3 +143,17 @@ async def remove_charity_project(
     charity_project = await get_project_or_404(project_id, session)
     project = InvestmentService(session)
     return await project.remove_charity_project(charity_project)
+
+
+@router.get(
+    '/{project_id}/investments',
+    response_model=list[InvestmentDB],
+    dependencies=[Depends(current_superuser)],
+)
+async def get_charity_project_investments(
+    project_id: int,
+    session: AsyncSession = Depends(get_async_read_session)
+):
+    """For superusers only"""
+    await get_project_or_404(project_id, session)
+    return await investment_crud.get_project_investments(project_id, session)
@@ -1,12 +1,25 @@
-from fastapi import APIRouter, Depends
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import (APIRouter, BackgroundTasks, Depends, File, Query, Request,
+                     Response, UploadFile)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.api.utils import (PageParams, get_export_response, get_import_rows,
+                           get_rows_response, get_schema_columns,
+                           get_user_donation_or_404, get_user_or_404)
+from app.core.config import Constants, settings
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import current_superuser, current_user
 from app.crud.donation import donation_crud
+from app.crud.investment import investment_crud
 from app.models import Donation, User
-from app.schemas.donation import (DonationCreate, DonationFullDB,
-                                  DonationShortDB)
+from app.schemas.data_import import ImportReport
+from app.schemas.donation import (DonationBulkCreate, DonationCreate,
+                                  DonationFullDB, DonationShortDB,
+                                  DonationStatusDB)
+from app.schemas.investment import InvestmentDB
 from app.services.investment_func import InvestmentService
 
 router = APIRouter()
@@ -19,13 +32,80 @@ router = APIRouter()
 )
 async def create_new_donation(
     donation: DonationCreate,
+    response: Response,
+    background_tasks: BackgroundTasks,
     user: User = Depends(current_user),
     session: AsyncSession = Depends(get_async_session)
 ):
     """For registered users"""
     invest_object = InvestmentService(session)
-    return await invest_object.create_object(
-        donation, Donation, user, need_for_commit=False
+    if not settings.deferred_donation_allocation:
+        return await invest_object.create_object(
+            donation, Donation, user, need_for_commit=False
+        )
+    new_donation = await invest_object.create_object(
+        donation, Donation, user, need_for_commit=False,
+        defer_allocation=True
+    )
+    background_tasks.add_task(
+        invest_object.allocate_pending_donation, new_donation.id
+    )
+    response.status_code = HTTPStatus.ACCEPTED
+    return new_donation
+
+
+@router.post(
+    '/bulk',
+    response_model=list[DonationShortDB],
+    response_model_exclude_none=True
+)
+async def create_new_donations_bulk(
+    donations: DonationBulkCreate,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """For registered users"""
+    invest_object = InvestmentService(session)
+    return await invest_object.create_donations_bulk(donations, user)
+
+
+@router.post(
+    '/import',
+    response_model=ImportReport,
+    dependencies=[Depends(current_superuser)],
+)
+async def import_donations(
+    user_id: int,
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(
+        None, alias='format', regex=Constants.IMPORT_FORMAT_REGEX
+    ),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """For superusers only, donations are owned by `user_id`"""
+    user = await get_user_or_404(user_id, session)
+    invest_object = InvestmentService(session)
+    return await invest_object.import_objects(
+        get_import_rows(file, file_format), Donation, user
+    )
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    dependencies=[Depends(current_superuser)]
+)
+async def export_donations(
+    file_format: str = Query(
+        Constants.EXPORT_FORMAT_NDJSON,
+        alias='format',
+        regex=Constants.EXPORT_FORMAT_REGEX
+    ),
+    session: AsyncSession = Depends(get_async_read_session)
+):
+    """For superusers only"""
+    return get_export_response(
+        donation_crud, DonationFullDB, file_format, 'donations', session
     )
 
 
@@ -36,10 +116,23 @@ async def create_new_donation(
     dependencies=[Depends(current_superuser)]
 )
 async def get_all_donations(
-    session: AsyncSession = Depends(get_async_session)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_async_read_session)
 ):
     """For superusers only"""
-    return await donation_crud.get_multi(session)
+    return get_rows_response(
+        page.set_next_page(
+            await donation_crud.get_page(
+                session, page.fetch_limit, page.after,
+                column_names=get_schema_columns(DonationFullDB)
+            ),
+            request,
+            response
+        ),
+        response
+    )
 
 
 @router.get(
@@ -49,10 +142,59 @@ async def get_all_donations(
     response_model_exclude={'user_id'}
 )
 async def get_my_donations(
-    session: AsyncSession = Depends(get_async_session),
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_async_read_session),
+    user: User = Depends(current_user)
+):
+    return get_rows_response(
+        page.set_next_page(
+            await donation_crud.get_user_donations_page(
+                session, user, page.fetch_limit, page.after,
+                get_schema_columns(DonationShortDB)
+            ),
+            request,
+            response
+        ),
+        response
+    )
+
+
+@router.get(
+    '/{donation_id}/status',
+    response_model=DonationStatusDB,
+)
+async def get_donation_status(
+    donation_id: int,
+    session: AsyncSession = Depends(get_async_read_session),
+    user: User = Depends(current_user)
+):
+    """For the donation owner and superusers"""
+    donation = await get_user_donation_or_404(donation_id, user, session)
+    return DonationStatusDB(
+        id=donation.id,
+        status=(
+            Constants.ALLOCATION_STATUS_PENDING
+            if donation.allocation_pending
+            else Constants.ALLOCATION_STATUS_DONE
+        ),
+        invested_amount=donation.invested_amount,
+        fully_invested=donation.fully_invested
+    )
+
+
+@router.get(
+    '/{donation_id}/investments',
+    response_model=list[InvestmentDB],
+)
+async def get_donation_investments(
+    donation_id: int,
+    session: AsyncSession = Depends(get_async_read_session),
     user: User = Depends(current_user)
 ):
-    return await donation_crud.get_user_donations(
-        session=session,
-        user=user
+    """For the donation owner and superusers"""
+    await get_user_donation_or_404(donation_id, user, session)
+    return await investment_crud.get_donation_investments(
+        donation_id, session
     )
@@ -1,14 +1,11 @@
-from aiogoogle import Aiogoogle
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import Constants
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session
 from app.core.google_client import get_service
 from app.core.user import current_superuser
-from app.crud.charity_project import charity_project_crud
-from app.services.google_api import (set_user_permissions, spreadsheets_create,
-                                     spreadsheets_update_value)
+from app.services.google_api import create_report
 
 router = APIRouter()
 
@@ -19,16 +16,9 @@ router = APIRouter()
     dependencies=[Depends(current_superuser)],
 )
 async def get_report(
-        session: AsyncSession = Depends(get_async_session),
-        wrapper_services: Aiogoogle = Depends(get_service)
+        session: AsyncSession = Depends(get_async_read_session),
+        wrapper_services=Depends(get_service)
 ):
     """Only for superuser"""
-    projects = await charity_project_crud.get_projects_by_completion_rate(
-        session
-    )
-    spreadsheetid = await spreadsheets_create(wrapper_services)
-    await set_user_permissions(spreadsheetid, wrapper_services)
-    await spreadsheets_update_value(spreadsheetid,
-                                    projects,
-                                    wrapper_services)
+    spreadsheetid = await create_report(session, wrapper_services)
     print(f'Your report is ready: {Constants.GOOGLE_PATH}{spreadsheetid}')
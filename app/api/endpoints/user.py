@@ -1,7 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-from app.core.user import auth_backend, fastapi_users
-from app.schemas.user import UserCreate, UserRead, UserUpdate
+from app.core.user import (auth_backend, current_superuser, fastapi_users,
+                           user_cache)
+from app.schemas.user import UserCacheStats, UserCreate, UserRead, UserUpdate
 
 router = APIRouter()
 
@@ -15,6 +16,19 @@ router.include_router(
     prefix='/auth',
     tags=['auth'],
 )
+
+
+@router.get(
+    '/users/cache',
+    response_model=UserCacheStats,
+    tags=['users'],
+    dependencies=[Depends(current_superuser)]
+)
+async def get_user_cache_stats():
+    """Only for superuser"""
+    return user_cache.stats
+
+
 users_router = fastapi_users.get_users_router(UserRead, UserUpdate)
 users_router.routes = [
     route for route in users_router.routes if route.name != 'users:delete_user'
@@ -1,11 +1,25 @@
+import base64
+import binascii
+import io
+import json
+from datetime import datetime
 from http import HTTPStatus
+from typing import Awaitable, Callable, Iterator, NamedTuple, Optional, Type
 
-from fastapi import HTTPException
+import orjson
+from fastapi import HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import app.crud.charity_project as crd
-from app.core.config import Messages
-from app.models import CharityProject
+import app.crud.donation as dcrd
+from app.core.config import Constants, Messages
+from app.crud.base import CRUDBase
+from app.models import CharityProject, Donation, User
+from app.services.data_export import write_rows
+from app.services.data_import import guess_format, read_rows
+from app.services.response_cache import response_cache
 
 
 async def get_project_or_404(
@@ -21,3 +35,208 @@ async def get_project_or_404(
             detail=Messages.PROJECT_NOT_FOUND
         )
     return charity_project
+
+
+async def get_user_donation_or_404(
+        donation_id: int,
+        user: User,
+        session: AsyncSession
+) -> Donation:
+    """Donation of the user; superusers can get any donation."""
+    donation = await dcrd.donation_crud.get(donation_id, session)
+    if donation is None or (
+            donation.user_id != user.id and not user.is_superuser
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail=Messages.DONATION_NOT_FOUND
+        )
+    return donation
+
+
+async def get_user_or_404(user_id: int, session: AsyncSession) -> User:
+    user = await session.get(User, user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail=Messages.USER_NOT_FOUND
+        )
+    return user
+
+
+def get_import_rows(
+        file: UploadFile,
+        file_format: Optional[str]
+) -> Iterator[tuple[int, Optional[dict]]]:
+    return read_rows(
+        io.TextIOWrapper(
+            file.file, encoding='utf-8', errors='surrogateescape'
+        ),
+        file_format or guess_format(file.filename)
+    )
+
+
+def get_export_response(
+        crud: CRUDBase,
+        schema: Type[BaseModel],
+        file_format: str,
+        filename: str,
+        session: AsyncSession
+) -> StreamingResponse:
+    """Streams all objects with the fields of `schema` as a file."""
+    fields = get_schema_columns(schema)
+    return StreamingResponse(
+        write_rows(
+            crud.stream_columns(session, fields), fields, file_format
+        ),
+        media_type=Constants.EXPORT_MEDIA_TYPES[file_format],
+        headers={
+            'Content-Disposition':
+                f'attachment; filename="{filename}.{file_format}"'
+        }
+    )
+
+
+class PageCursor(NamedTuple):
+    create_date: datetime
+    id: int
+
+    def encode(self) -> str:
+        payload = json.dumps([self.create_date.isoformat(), self.id])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @classmethod
+    def decode(cls, cursor: str) -> 'PageCursor':
+        try:
+            create_date, obj_id = json.loads(base64.urlsafe_b64decode(cursor))
+            return cls(datetime.fromisoformat(create_date), int(obj_id))
+        except (binascii.Error, TypeError, ValueError):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=Messages.PAGE_CURSOR_INVALID
+            )
+
+
+class PageParams:
+    """Keyset pagination of list endpoints on `(create_date, id)`.
+
+    The body stays a plain list. If there are more objects, the cursor
+    of the next page is sent in the `X-Next-Cursor` header and as a
+    `rel="next"` link in the `Link` header.
+    """
+
+    def __init__(
+            self,
+            limit: int = Query(
+                Constants.PAGE_SIZE_DEFAULT,
+                ge=1,
+                le=Constants.PAGE_SIZE_MAX
+            ),
+            cursor: Optional[str] = None,
+            paginate: bool = Query(
+                True, description='false returns the whole list at once'
+            )
+    ):
+        self.limit = limit
+        self.paginate = paginate
+        self.after = PageCursor.decode(cursor) if cursor else None
+
+    @property
+    def fetch_limit(self) -> Optional[int]:
+        """One extra row tells whether there is a next page."""
+        return self.limit + 1 if self.paginate else None
+
+    def set_next_page(
+            self,
+            db_objs: list,
+            request: Request,
+            response: Response
+    ) -> list:
+        """Cuts the page fetched with `fetch_limit` and links the next one."""
+        if not self.paginate or len(db_objs) <= self.limit:
+            return db_objs
+        db_objs = db_objs[:self.limit]
+        next_cursor = PageCursor(
+            db_objs[-1].create_date, db_objs[-1].id
+        ).encode()
+        next_url = request.url.include_query_params(
+            cursor=next_cursor, limit=self.limit
+        )
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+        return db_objs
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is None:
+        return False
+    return any(
+        tag.strip() in (etag, f'W/{etag}', '*')
+        for tag in if_none_match.split(',')
+    )
+
+
+def get_schema_columns(schema: Type[BaseModel]) -> list[str]:
+    return list(schema.__fields__)
+
+
+def get_page_headers(response: Response) -> dict[str, str]:
+    return {
+        name: response.headers[name]
+        for name in ('Link', 'X-Next-Cursor')
+        if name in response.headers
+    }
+
+
+def get_rows_content(rows: list) -> list[dict]:
+    """Column rows as response items without `None` values.
+
+    Rows are selected by `get_schema_columns` of the response schema,
+    so they are not validated once more.
+    """
+    return [
+        {name: value for name, value in row._mapping.items()
+         if value is not None}
+        for row in rows
+    ]
+
+
+def get_rows_response(rows: list, response: Response) -> ORJSONResponse:
+    return ORJSONResponse(
+        get_rows_content(rows), headers=get_page_headers(response)
+    )
+
+
+async def get_cached_response(
+        request: Request,
+        get_rows: Callable[[Response], Awaitable[list]]
+) -> Response:
+    """Serves a list endpoint from `response_cache` with a strong ETag.
+
+    `get_rows` is only called on a cache miss; it gets a response to put
+    pagination headers to. A request whose `If-None-Match` matches the
+    cached ETag gets 304 without touching the database.
+    """
+    key = f'{request.url.path}?{sorted(request.query_params.multi_items())}'
+    entry = response_cache.get(key)
+    if entry is None:
+        version = response_cache.version
+        response = Response()
+        rows = await get_rows(response)
+        entry = response_cache.put(
+            key,
+            version,
+            orjson.dumps(get_rows_content(rows)),
+            get_page_headers(response)
+        )
+    if etag_matches(request, entry.etag):
+        return Response(
+            status_code=HTTPStatus.NOT_MODIFIED,
+            headers={'ETag': entry.etag}
+        )
+    return Response(
+        entry.body,
+        media_type='application/json',
+        headers={'ETag': entry.etag, **entry.headers}
+    )
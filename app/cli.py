@@ -0,0 +1,167 @@
+"""Command-line entry point: python -m app.cli --help"""
+import argparse
+import asyncio
+import json
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import Constants
+from app.core.db import AsyncSessionLocal
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation, User
+from app.schemas.data_import import ImportReport
+from app.services.allocation_kernel import close_times, fifo_allocate
+from app.services.data_import import guess_format, read_rows
+from app.services.investment_func import InvestmentService
+
+IMPORT_MODELS = {
+    'projects': CharityProject,
+    'donations': Donation,
+}
+REPLAY_PATTERNS = ('historical', 'uniform', 'shuffled')
+
+
+async def import_file(
+        path: str,
+        kind: str,
+        file_format: Optional[str] = None,
+        user_id: Optional[int] = None
+) -> ImportReport:
+    async with AsyncSessionLocal() as session:
+        user = None
+        if user_id is not None:
+            user = await session.get(User, user_id)
+            if user is None:
+                raise SystemExit(f'User {user_id} not found')
+        with open(
+                path, encoding='utf-8', errors='surrogateescape', newline=''
+        ) as stream:
+            return await InvestmentService(session).import_objects(
+                read_rows(stream, file_format or guess_format(path)),
+                IMPORT_MODELS[kind],
+                user
+            )
+
+
+async def load_history() -> tuple[np.ndarray, ...]:
+    """Full amounts and arrival timestamps of donations and projects."""
+    arrays = []
+    async with AsyncSessionLocal() as session:
+        for crud in (donation_crud, charity_project_crud):
+            history = await crud.get_fifo_history(session)
+            arrays.append(np.array(
+                [full_amount for full_amount, _ in history], dtype=np.int64
+            ))
+            arrays.append(np.array(
+                [create_date.timestamp() for _, create_date in history],
+                dtype=np.float64
+            ))
+    return tuple(arrays)
+
+
+def rearrange(
+        amounts: np.ndarray,
+        arrivals: np.ndarray,
+        pattern: str,
+        rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+    if pattern == 'uniform' and arrivals.size:
+        arrivals = np.linspace(arrivals[0], arrivals[-1], arrivals.size)
+    elif pattern == 'shuffled':
+        amounts = rng.permutation(amounts)
+    return amounts, arrivals
+
+
+def replay(
+        history: tuple[np.ndarray, ...],
+        pattern: str = 'historical',
+        seed: int = 0
+) -> dict:
+    """Replays the whole history from scratch with the allocation kernel."""
+    rng = np.random.default_rng(seed)
+    donations, donation_arrivals, projects, project_arrivals = history
+    donations, donation_arrivals = rearrange(
+        donations, donation_arrivals, pattern, rng
+    )
+    projects, project_arrivals = rearrange(
+        projects, project_arrivals, pattern, rng
+    )
+    allocation = fifo_allocate(donations, projects)
+    project_closed = close_times(
+        projects, project_arrivals, donations, donation_arrivals
+    )
+    closed = ~np.isnan(project_closed)
+    collection_hours = (
+        project_closed[closed] - project_arrivals[closed]
+    ) / 3600
+    return {
+        'pattern': pattern,
+        'donations': int(donations.size),
+        'projects': int(projects.size),
+        'allocated': int(allocation.amount.sum()),
+        'transfers': int(allocation.amount.size),
+        'donations_fully_invested': int(
+            (allocation.donation_invested == donations).sum()
+        ),
+        'projects_fully_invested': int(closed.sum()),
+        'mean_collection_hours': (
+            float(collection_hours.mean()) if collection_hours.size else None
+        ),
+        'median_collection_hours': (
+            float(np.median(collection_hours))
+            if collection_hours.size else None
+        ),
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m app.cli')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser(
+        'import',
+        help='bulk import of charity projects or donations '
+             'from CSV or JSONL file'
+    )
+    import_parser.add_argument('kind', choices=IMPORT_MODELS)
+    import_parser.add_argument('path')
+    import_parser.add_argument(
+        '--format',
+        choices=(Constants.IMPORT_FORMAT_CSV, Constants.IMPORT_FORMAT_JSONL),
+        help='file format, guessed by file extension by default'
+    )
+    import_parser.add_argument(
+        '--user-id', type=int,
+        help='owner of imported donations, required for donations'
+    )
+
+    replay_parser = commands.add_parser(
+        'replay',
+        help='replay the history of donations and projects with the '
+             'vectorized allocation kernel'
+    )
+    replay_parser.add_argument(
+        '--pattern', choices=REPLAY_PATTERNS, action='append',
+        help='arrival pattern, can be given several times; '
+             'historical by default'
+    )
+    replay_parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == 'replay':
+        history = asyncio.run(load_history())
+        for pattern in args.pattern or ['historical']:
+            print(json.dumps(replay(history, pattern, args.seed)))
+        return
+    if args.kind == 'donations' and args.user_id is None:
+        parser.error('--user-id is required to import donations')
+    report = asyncio.run(
+        import_file(args.path, args.kind, args.format, args.user_id)
+    )
+    print(report.json(indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from aiogoogle import Aiogoogle
+from aiogoogle.resource import GoogleAPI
+from aiogoogle.sessions.aiohttp_session import AiohttpSession
+
+from app.core.config import Constants
+
+
+class PersistentAiogoogle(Aiogoogle):
+    """Aiogoogle client meant to live as long as the process.
+
+    Every request goes through one HTTP session opened by `open` instead
+    of a session per `async with` block. The service account token is
+    kept by the instance until two minutes before it expires. Discovery
+    documents are kept in memory and, for `discovery_ttl` seconds, as
+    JSON files in `discovery_dir`, so restarts skip them too.
+    """
+
+    def __init__(
+            self,
+            *args,
+            discovery_dir: Optional[str] = None,
+            discovery_ttl: int = Constants.GOOGLE_DISCOVERY_TTL,
+            **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.session: Optional[AiohttpSession] = None
+        self.discovery_dir = (
+            Path(discovery_dir) if discovery_dir is not None else None
+        )
+        self.discovery_ttl = discovery_ttl
+        self.apis: dict[tuple[str, str], GoogleAPI] = {}
+
+    async def open(self) -> None:
+        self.session = self.session_factory()
+        await self.session.__aenter__()
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.__aexit__(None, None, None)
+            self.session = None
+
+    def _get_session(self) -> Optional[AiohttpSession]:
+        return self.session
+
+    def get_discovery_path(self, api_name: str, api_version: str) -> Path:
+        return self.discovery_dir / f'{api_name}.{api_version}.json'
+
+    def read_discovery(
+            self, api_name: str, api_version: str
+    ) -> Optional[dict]:
+        if self.discovery_dir is None:
+            return None
+        path = self.get_discovery_path(api_name, api_version)
+        try:
+            if path.stat().st_mtime + self.discovery_ttl < time.time():
+                return None
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def write_discovery(
+            self, api_name: str, api_version: str, document: dict
+    ) -> None:
+        if self.discovery_dir is None:
+            return
+        path = self.get_discovery_path(api_name, api_version)
+        try:
+            self.discovery_dir.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_suffix(f'.{os.getpid()}.tmp')
+            temporary.write_text(json.dumps(document), encoding='utf-8')
+            os.replace(temporary, path)
+        except OSError:
+            pass
+
+    async def discover(
+            self,
+            api_name: str,
+            api_version: Optional[str] = None,
+            validate: bool = False,
+            **kwargs
+    ) -> GoogleAPI:
+        if api_version is None:
+            return await super().discover(
+                api_name, api_version, validate, **kwargs
+            )
+        key = (api_name, api_version)
+        if key not in self.apis:
+            document = self.read_discovery(api_name, api_version)
+            if document is not None:
+                self.apis[key] = GoogleAPI(document, validate)
+            else:
+                self.apis[key] = await super().discover(
+                    api_name, api_version, validate, **kwargs
+                )
+                self.write_discovery(
+                    api_name, api_version,
+                    self.apis[key].discovery_document
+                )
+        return self.apis[key]
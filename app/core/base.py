@@ -1,4 +1,4 @@
 """Base class and all models import for Alembic."""
 from app.core.db import Base  # noqa
-from app.models import (CharityProject, Donation, InvestmentBaseModel,  # noqa
-                        User)
+from app.models import (CharityProject, Donation, Investment,  # noqa
+                        InvestmentBaseModel, User)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseSettings, EmailStr
 
@@ -8,11 +8,33 @@ class Settings(BaseSettings):
     app_description: str = 'Приложение для Благотворительного фонда ' \
                            'поддержки котиков QRKot'
     database_url: str = 'sqlite+aiosqlite:///./fastapi.db'
+    pool_size: int = 5
+    pool_max_overflow: int = 10
+    pool_timeout: int = 30
+    pool_pre_ping: bool = False
+    pool_recycle: int = -1
+    pool_metrics_enabled: bool = False
+    read_replica_url: Optional[str] = None
+    read_replica_lag: int = 5
+    sqlite_journal_mode: Literal[
+        'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'
+    ] = 'WAL'
+    sqlite_synchronous: Literal['OFF', 'NORMAL', 'FULL', 'EXTRA'] = 'NORMAL'
+    sqlite_busy_timeout: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -64 * 1024
     secret: str = 'SECRET'
     first_superuser_email: Optional[EmailStr] = None
     first_superuser_password: Optional[str] = None
     jwt_token_lifetime: int = 3600
     user_password_min_len: int = 4
+    investment_mode: Literal['sql', 'orm', 'ledger'] = 'sql'
+    allocation_worker_enabled: bool = False
+    deferred_donation_allocation: bool = False
+    response_cache_enabled: bool = False
+    user_cache_ttl: int = 60
+    password_hash_rounds: int = 12
+    password_hash_workers: int = 4
     logging_format: str = '%(asctime)s - %(levelname)s - %(message)s'
     logging_dt_format: str = '%Y-%m-%d %H:%M:%S'
     type: Optional[str] = None
@@ -26,6 +48,7 @@ class Settings(BaseSettings):
     auth_provider_x509_cert_url: Optional[str] = None
     client_x509_cert_url: Optional[str] = None
     email: Optional[str] = None
+    google_discovery_cache_dir: Optional[str] = '.google_discovery'
 
     class Config:
         env_file = '.env'
@@ -43,8 +66,34 @@ class Constants:
     PROJECT_ENDPOINTS_TAGS = ('charity_projects',)
     DONATION_ENDPOINTS_PREFIX = '/donation'
     DONATION_ENDPOINTS_TAGS = ('donations',)
+    INVESTMENT_BATCH_SIZE = 50
+    BULK_CHUNK_SIZE = 500
+    ALLOCATION_QUEUE_SIZE = 1000
+    ALLOCATION_BATCH_SIZE = 100
+    BULK_MAX_SIZE = 10000
+    ALLOCATION_STATUS_PENDING = 'pending'
+    ALLOCATION_STATUS_DONE = 'done'
+    IMPORT_FORMAT_CSV = 'csv'
+    IMPORT_FORMAT_JSONL = 'jsonl'
+    IMPORT_FORMAT_REGEX = '^(csv|jsonl)$'
+    EXPORT_FORMAT_CSV = 'csv'
+    EXPORT_FORMAT_NDJSON = 'ndjson'
+    EXPORT_FORMAT_REGEX = '^(csv|ndjson)$'
+    EXPORT_MEDIA_TYPES = {
+        'csv': 'text/csv',
+        'ndjson': 'application/x-ndjson',
+    }
+    EXPORT_CHUNK_SIZE = 1000
+    RESPONSE_CACHE_SIZE = 256
+    USER_CACHE_SIZE = 1024
+    READ_PRIMARY_COOKIE = 'read_primary_until'
+    READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    PAGE_SIZE_DEFAULT = 100
+    PAGE_SIZE_MAX = 1000
     ROWS = 100
+    REPORT_TOP_SIZE = 47
     COLUMNS = 3
+    GOOGLE_DISCOVERY_TTL = 24 * 60 * 60
     GOOGLE_PATH = 'https://docs.google.com/spreadsheets/d/'
 
 
@@ -56,6 +105,7 @@ class Messages:
     EMAIL_IN_PASSWORD = 'Password should not contain email'
     USER_REGISTERED = 'User registered: '
     INVESTMENT_ERROR = 'An error has occurred during investment'
+    ALLOCATION_WORKER_STOPPED = 'Allocation worker is not running'
     PROJECT_AMOUNTS_ERROR = 'Full amount cannot be less than already ' \
                             'invested amount'
     PROJECT_FUTURE_DATE_ERROR = 'Date of project opening cannot be ' \
@@ -66,3 +116,9 @@ class Messages:
     PROJECT_NOT_FOUND = 'Project with given ID not found'
     PROJECT_INVESTED = 'Project was already invested, cannot delete'
     PROJECT_CLOSED = 'Closed project cannot be edited'
+    IMPORT_MALFORMED_ROW = 'Row cannot be parsed'
+    DONATION_NOT_FOUND = 'Donation with given ID not found'
+    USER_NOT_FOUND = 'User with given ID not found'
+    REPORT_STAGE = 'Google report: %s took %.1f ms'
+    POOL_USAGE = '%s %s: %d pool checkouts, %.1f ms checked out'
+    PAGE_CURSOR_INVALID = 'Page cursor is invalid'
@@ -1,8 +1,17 @@
-from sqlalchemy import Column, Integer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import time
+from http import HTTPStatus
+
+from fastapi import Depends, Request
+from sqlalchemy import Column, Integer, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    create_async_engine)
 from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.core.config import settings
+from app.core.config import Constants, settings
+from app.core.pool_metrics import pool_metrics
 
 
 class PreBase:
@@ -16,11 +25,140 @@ class PreBase:
 
 Base = declarative_base(cls=PreBase)
 
-engine = create_async_engine(settings.database_url)
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'PRAGMA synchronous={settings.sqlite_synchronous}')
+    cursor.execute(f'PRAGMA busy_timeout={settings.sqlite_busy_timeout:d}')
+    cursor.execute(f'PRAGMA mmap_size={settings.sqlite_mmap_size:d}')
+    cursor.execute(f'PRAGMA cache_size={settings.sqlite_cache_size:d}')
+    cursor.close()
+
+
+def set_sqlite_journal_mode(dbapi_connection, connection_record) -> None:
+    """WAL lets readers and the writer work at the same time.
+
+    The journal mode is stored in the database file, so read-only
+    connections cannot and need not set it.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'PRAGMA journal_mode={settings.sqlite_journal_mode}')
+    cursor.close()
+
+
+def create_engine(database_url: str, read_only: bool = False) -> AsyncEngine:
+    """Engine with the pool and, for SQLite files, pragmas from settings.
+
+    A read-only SQLite engine opens the file in `mode=ro`, so a local
+    database can stand in for a read replica.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite' and url.database in (
+            None, '', ':memory:'
+    ):
+        return create_async_engine(url)
+    pool_options = {
+        'pool_size': settings.pool_size,
+        'max_overflow': settings.pool_max_overflow,
+        'pool_timeout': settings.pool_timeout,
+        'pool_pre_ping': settings.pool_pre_ping,
+        'pool_recycle': settings.pool_recycle,
+    }
+    if url.get_backend_name() != 'sqlite':
+        return create_async_engine(url, **pool_options)
+    if read_only and not url.database.startswith('file:'):
+        url = url.set(
+            database=f'file:{url.database}',
+            query={**url.query, 'mode': 'ro', 'uri': 'true'}
+        )
+    sqlite_engine = create_async_engine(
+        url, poolclass=AsyncAdaptedQueuePool, **pool_options
+    )
+    event.listen(sqlite_engine.sync_engine, 'connect', set_sqlite_pragmas)
+    if not read_only:
+        event.listen(
+            sqlite_engine.sync_engine, 'connect', set_sqlite_journal_mode
+        )
+    return sqlite_engine
+
+
+engine = create_engine(settings.database_url)
 
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
 
+read_engine = (
+    create_engine(settings.read_replica_url, read_only=True)
+    if settings.read_replica_url else None
+)
+
+AsyncReadSessionLocal = (
+    sessionmaker(read_engine, class_=AsyncSession)
+    if read_engine is not None else None
+)
+
+for watched_engine in (engine, read_engine):
+    if watched_engine is not None:
+        pool_metrics.watch(watched_engine)
+
 
 async def get_async_session():
     async with AsyncSessionLocal() as async_session:
         yield async_session
+
+
+def reads_from_primary(request: Request) -> bool:
+    """Clients that have just written read their own writes."""
+    if AsyncReadSessionLocal is None:
+        return True
+    pinned_until = request.cookies.get(Constants.READ_PRIMARY_COOKIE, '')
+    return pinned_until.isdigit() and int(pinned_until) > time.time()
+
+
+async def get_async_read_session(
+        request: Request,
+        session: AsyncSession = Depends(get_async_session)
+):
+    """Session on the read replica, or the primary one.
+
+    The primary session is only created, not connected, when the
+    replica is used.
+    """
+    if reads_from_primary(request):
+        yield session
+        return
+    async with AsyncReadSessionLocal() as async_session:
+        yield async_session
+
+
+class ReadPrimaryMiddleware:
+    """Pins clients to the primary for a while after each write.
+
+    Successful non-read requests get a cookie with the moment their
+    reads may go back to the replica, so the state survives restarts
+    and works across processes.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (scope['type'] != 'http' or
+                scope['method'] in Constants.READ_METHODS or
+                AsyncReadSessionLocal is None):
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message: Message) -> None:
+            if (message['type'] == 'http.response.start' and
+                    message['status'] < HTTPStatus.BAD_REQUEST):
+                max_age = settings.read_replica_lag + 1
+                cookie = (
+                    f'{Constants.READ_PRIMARY_COOKIE}='
+                    f'{int(time.time()) + max_age}; '
+                    f'Max-Age={max_age}; Path=/; HttpOnly'
+                )
+                message.setdefault('headers', []).append(
+                    (b'set-cookie', cookie.encode('latin-1'))
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -1,8 +1,14 @@
-from aiogoogle import Aiogoogle
-from aiogoogle.auth.creds import ServiceAccountCreds
+import asyncio
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from aiogoogle.auth.creds import ServiceAccountCreds
+
+    from app.core.aiogoogle_client import PersistentAiogoogle
+
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
     'https://www.googleapis.com/auth/drive'
@@ -21,9 +27,44 @@ INFO = {
     'client_x509_cert_url': settings.client_x509_cert_url
 }
 
-cred = ServiceAccountCreds(scopes=SCOPES, **INFO)
+
+@lru_cache(maxsize=None)
+def get_credentials() -> 'ServiceAccountCreds':
+    """Built on the first report, aiogoogle is not imported before."""
+    from aiogoogle.auth.creds import ServiceAccountCreds
+
+    return ServiceAccountCreds(scopes=SCOPES, **INFO)
+
+
+class GoogleClient:
+    """Single Aiogoogle client of the process, created on first use."""
+
+    def __init__(self):
+        self.aiogoogle: Optional['PersistentAiogoogle'] = None
+        self.lock = asyncio.Lock()
+
+    async def get(self) -> 'PersistentAiogoogle':
+        async with self.lock:
+            if self.aiogoogle is None:
+                from app.core.aiogoogle_client import PersistentAiogoogle
+
+                aiogoogle = PersistentAiogoogle(
+                    service_account_creds=get_credentials(),
+                    discovery_dir=settings.google_discovery_cache_dir
+                )
+                await aiogoogle.open()
+                self.aiogoogle = aiogoogle
+        return self.aiogoogle
+
+    async def close(self) -> None:
+        async with self.lock:
+            if self.aiogoogle is not None:
+                await self.aiogoogle.close()
+                self.aiogoogle = None
+
+
+google_client = GoogleClient()
 
 
-async def get_service():
-    async with Aiogoogle(service_account_creds=cred) as aiogoogle:
-        yield aiogoogle
+async def get_service() -> 'PersistentAiogoogle':
+    return await google_client.get()
@@ -21,6 +21,9 @@ async def create_user(
     try:
         async with get_async_session_context() as session:
             async with get_user_db_context(session) as user_db:
+                # Hashing the password costs more than the whole lookup.
+                if await user_db.get_by_email(email) is not None:
+                    return
                 async with get_user_manager_context(user_db) as user_manager:
                     await user_manager.create(
                         UserCreate(
@@ -0,0 +1,107 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import Messages, settings
+
+
+class PoolUsage:
+    """Connections a single request took from the pool."""
+    __slots__ = ('checkouts', 'held_seconds')
+
+    def __init__(self):
+        self.checkouts = 0
+        self.held_seconds = 0.0
+
+
+class PoolMetrics:
+    """Pool checkouts and checked-out time per request.
+
+    Sessions check out a connection on their first query only, so
+    requests answered from a cache or rejected before any query should
+    show no checkouts. Pooled connections remember the request that
+    took them, the time is counted when they are returned.
+    """
+
+    def __init__(self):
+        self.current: ContextVar[Optional[PoolUsage]] = ContextVar(
+            'pool_usage', default=None
+        )
+        self.requests = 0
+        self.requests_with_checkouts = 0
+        self.checkouts = 0
+        self.held_seconds = 0.0
+
+    def watch(self, engine: AsyncEngine) -> None:
+        event.listen(engine.sync_engine, 'checkout', self.on_checkout)
+        event.listen(engine.sync_engine, 'checkin', self.on_checkin)
+
+    def unwatch(self, engine: AsyncEngine) -> None:
+        event.remove(engine.sync_engine, 'checkout', self.on_checkout)
+        event.remove(engine.sync_engine, 'checkin', self.on_checkin)
+
+    def on_checkout(self, dbapi_connection, connection_record, proxy):
+        usage = self.current.get()
+        if usage is None:
+            return
+        usage.checkouts += 1
+        connection_record.info['pool_usage'] = (usage, time.perf_counter())
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        usage, checked_out_at = connection_record.info.pop(
+            'pool_usage', (None, None)
+        )
+        if usage is not None:
+            usage.held_seconds += time.perf_counter() - checked_out_at
+
+    def add(self, usage: PoolUsage) -> None:
+        self.requests += 1
+        self.requests_with_checkouts += bool(usage.checkouts)
+        self.checkouts += usage.checkouts
+        self.held_seconds += usage.held_seconds
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.requests_with_checkouts = 0
+        self.checkouts = 0
+        self.held_seconds = 0.0
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            'requests': self.requests,
+            'requests_with_checkouts': self.requests_with_checkouts,
+            'checkouts': self.checkouts,
+            'held_seconds': self.held_seconds,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class PoolMetricsMiddleware:
+    """Counts and logs pool usage of every request when enabled."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or not settings.pool_metrics_enabled:
+            return await self.app(scope, receive, send)
+        usage = PoolUsage()
+        token = pool_metrics.current.set(usage)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool_metrics.current.reset(token)
+            pool_metrics.add(usage)
+            logging.info(
+                Messages.POOL_USAGE,
+                scope['method'], scope['path'],
+                usage.checkouts, usage.held_seconds * 1000
+            )
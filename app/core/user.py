@@ -1,13 +1,23 @@
+import asyncio
 import logging
-from typing import Optional, Union
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Union
 
 from fastapi import Depends, Request
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_users import (BaseUserManager, FastAPIUsers, IntegerIDMixin,
                            InvalidPasswordException)
 from fastapi_users.authentication import (AuthenticationBackend,
                                           BearerTransport, JWTStrategy)
+from fastapi_users.exceptions import UserAlreadyExists, UserNotExists
+from fastapi_users.password import PasswordHelper
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from passlib.context import CryptContext
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.core.config import Constants, Messages, settings
 from app.core.db import get_async_session
@@ -15,8 +25,97 @@ from app.models.user import User
 from app.schemas.user import UserCreate
 
 
+class UserCache:
+    """Bounded LRU cache of user rows by id, each kept for `ttl` seconds.
+
+    Column values are cached rather than instances, so every hit gets its
+    own object in the session of its request. The cache is process-local:
+    changes made by other processes are seen after `ttl` at the latest.
+    """
+
+    def __init__(
+            self,
+            max_size: int = Constants.USER_CACHE_SIZE,
+            ttl: int = settings.user_cache_ttl
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[dict]:
+        if self.ttl <= 0:
+            return None
+        entry = self.entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            self.entries.pop(user_id, None)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user: User) -> None:
+        if self.ttl <= 0:
+            return
+        self.entries[user.id] = (
+            time.monotonic() + self.ttl,
+            {
+                column.key: getattr(user, column.key)
+                for column in inspect(User).column_attrs
+            }
+        )
+        self.entries.move_to_end(user.id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self.entries.pop(user_id, None)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+        }
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+user_cache = UserCache()
+
+
+class CachedUserDatabase(SQLAlchemyUserDatabase):
+    """User database which reads users by id through `user_cache`."""
+
+    async def get(self, id: int) -> Optional[User]:
+        values = user_cache.get(id)
+        if values is None:
+            user = await super().get(id)
+            if user is not None:
+                user_cache.put(user)
+            return user
+        user = User(**values)
+        make_transient_to_detached(user)
+        return await self.session.merge(user, load=False)
+
+    async def update(self, user: User, update_dict: dict[str, Any]) -> User:
+        user = await super().update(user, update_dict)
+        user_cache.invalidate(user.id)
+        return user
+
+    async def delete(self, user: User) -> None:
+        user_cache.invalidate(user.id)
+        await super().delete(user)
+
+
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
-    yield SQLAlchemyUserDatabase(session, User)
+    yield CachedUserDatabase(session, User)
 
 
 bearer_transport = BearerTransport(tokenUrl=Constants.JWT_TOKEN_URL)
@@ -36,7 +135,106 @@ auth_backend = AuthenticationBackend(
 )
 
 
+class AsyncPasswordHelper(PasswordHelper):
+    """bcrypt hashing and verification in a bounded thread pool.
+
+    Hashes made with fewer than `rounds` rounds are reported for update
+    by `verify_and_update`, so they are upgraded at the next login.
+    """
+
+    def __init__(
+            self,
+            rounds: int = settings.password_hash_rounds,
+            max_workers: int = settings.password_hash_workers
+    ):
+        super().__init__(CryptContext(
+            schemes=['bcrypt'],
+            deprecated='auto',
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds
+        ))
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='password-hash'
+        )
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.hash, password
+        )
+
+    async def verify_and_update_async(
+            self,
+            plain_password: str,
+            hashed_password: str
+    ) -> tuple[bool, Optional[str]]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            self.verify_and_update,
+            plain_password,
+            hashed_password
+        )
+
+
+password_helper = AsyncPasswordHelper()
+
+
 class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
+    """User manager which never runs bcrypt on the event loop."""
+
+    password_helper: AsyncPasswordHelper
+
+    async def create(
+            self,
+            user_create: UserCreate,
+            safe: bool = False,
+            request: Optional[Request] = None
+    ) -> User:
+        await self.validate_password(user_create.password, user_create)
+        if await self.user_db.get_by_email(user_create.email) is not None:
+            raise UserAlreadyExists()
+        user_dict = (
+            user_create.create_update_dict() if safe
+            else user_create.create_update_dict_superuser()
+        )
+        user_dict['hashed_password'] = await self.password_helper.hash_async(
+            user_dict.pop('password')
+        )
+        created_user = await self.user_db.create(user_dict)
+        await self.on_after_register(created_user, request)
+        return created_user
+
+    async def _update(self, user: User, update_dict: dict[str, Any]) -> User:
+        if 'password' in update_dict:
+            update_dict = dict(update_dict)
+            password = update_dict.pop('password')
+            await self.validate_password(password, user)
+            update_dict['hashed_password'] = (
+                await self.password_helper.hash_async(password)
+            )
+        return await super()._update(user, update_dict)
+
+    async def authenticate(
+            self,
+            credentials: OAuth2PasswordRequestForm
+    ) -> Optional[User]:
+        try:
+            user = await self.get_by_email(credentials.username)
+        except UserNotExists:
+            # Hash anyway, so unknown emails take as long as known ones.
+            await self.password_helper.hash_async(credentials.password)
+            return None
+        verified, updated_password_hash = (
+            await self.password_helper.verify_and_update_async(
+                credentials.password, user.hashed_password
+            )
+        )
+        if not verified:
+            return None
+        if updated_password_hash is not None:
+            await self.user_db.update(
+                user, {'hashed_password': updated_password_hash}
+            )
+        return user
 
     async def validate_password(
         self,
@@ -59,7 +257,7 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
 
 
 async def get_user_manager(user_db=Depends(get_user_db)):
-    yield UserManager(user_db)
+    yield UserManager(user_db, password_helper)
 
 fastapi_users = FastAPIUsers[User, int](
     get_user_manager,
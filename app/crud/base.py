@@ -1,6 +1,9 @@
-from sqlalchemy import select
+from typing import AsyncIterator, Iterable, Optional, Sequence
+
+from sqlalchemy import and_, bindparam, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import Constants
 from app.models import CharityProject
 
 
@@ -53,3 +56,223 @@ class CRUDBase:
                 self.model.create_date)
         )
         return open_projects.scalars().all()
+
+    def created_after(self, after):
+        """Keyset condition: objects after `after` in `(create_date, id)`.
+
+        The leading `create_date >=` lets the database seek the index
+        instead of filtering it from the start.
+        """
+        return and_(
+            self.model.create_date >= after.create_date,
+            or_(
+                self.model.create_date > after.create_date,
+                self.model.id > after.id
+            )
+        )
+
+    async def get_page(
+            self,
+            session: AsyncSession,
+            limit: Optional[int],
+            after=None,
+            criteria: tuple = (),
+            column_names: Optional[Sequence[str]] = None
+    ):
+        """Up to `limit` objects ordered by `(create_date, id)`.
+
+        `after` is the last object of the previous page, so every page
+        is an index range read whatever its depth. With `column_names`
+        only these columns are selected and rows are returned instead of
+        objects. `limit=None` reads to the end.
+        """
+        if column_names is None:
+            query = select(self.model)
+        else:
+            query = select(
+                *(getattr(self.model, name) for name in column_names)
+            )
+        query = query.where(*criteria)
+        if after is not None:
+            query = query.where(self.created_after(after))
+        db_objs = await session.execute(
+            query.order_by(self.model.create_date, self.model.id).limit(limit)
+        )
+        if column_names is None:
+            return db_objs.scalars().all()
+        return db_objs.all()
+
+    async def stream_columns(
+            self,
+            session: AsyncSession,
+            column_names: Iterable[str],
+            chunk_size: int = Constants.EXPORT_CHUNK_SIZE
+    ) -> AsyncIterator[list]:
+        """All objects as chunks of column rows, ordered by creation.
+
+        Rows come from a server-side cursor, so only one chunk is held in
+        memory at a time.
+        """
+        result = await session.stream(
+            select(
+                *(getattr(self.model, name) for name in column_names)
+            ).order_by(
+                self.model.create_date, self.model.id
+            ).execution_options(yield_per=chunk_size)
+        )
+        async for chunk in result.partitions():
+            yield chunk
+
+    async def get_open_batch(
+            self,
+            session: AsyncSession,
+            after=None,
+            limit: int = Constants.INVESTMENT_BATCH_SIZE
+    ):
+        """Next page of open objects in FIFO order.
+
+        Rows of `id, full_amount, invested_amount, create_date`. Keyset
+        pagination on `(create_date, id)`: `after` is the last row of the
+        previous page.
+        """
+        query = select(
+            self.model.id,
+            self.model.full_amount,
+            self.model.invested_amount,
+            self.model.create_date
+        ).where(
+            self.model.fully_invested == False  # noqa: E712
+        )
+        if after is not None:
+            query = query.where(self.created_after(after))
+        open_objects = await session.execute(
+            query.order_by(self.model.create_date, self.model.id).limit(limit)
+        )
+        return open_objects.all()
+
+    async def get_fifo_history(self, session: AsyncSession):
+        """`(full_amount, create_date)` of all objects in FIFO order."""
+        history = await session.execute(
+            select(self.model.full_amount, self.model.create_date).order_by(
+                self.model.create_date, self.model.id
+            )
+        )
+        return history.all()
+
+    async def get_open_running_totals(
+            self,
+            amount: int,
+            session: AsyncSession,
+            limit: int = Constants.INVESTMENT_BATCH_SIZE
+    ):
+        """Open objects in FIFO order which are needed to cover `amount`.
+
+        Every row carries `allocated_before` - the running total of
+        remainders of all the open objects created before it, so the
+        last returned row is the one that covers the rest of the amount.
+        The window is evaluated over keyset pages of `limit` open
+        objects, the next page is read only while the amount is not
+        covered.
+        """
+        remainder = self.model.full_amount - self.model.invested_amount
+        touched = []
+        after = None
+        allocated = 0
+        while allocated < amount:
+            query = select(
+                self.model.id,
+                self.model.full_amount,
+                self.model.invested_amount,
+                self.model.create_date,
+                remainder.label('remainder')
+            ).where(
+                self.model.fully_invested == False  # noqa: E712
+            )
+            if after is not None:
+                query = query.where(self.created_after(after))
+            page = query.order_by(
+                self.model.create_date, self.model.id
+            ).limit(limit).subquery()
+            rows = (await session.execute(
+                select(
+                    page.c.id,
+                    page.c.full_amount,
+                    page.c.invested_amount,
+                    page.c.create_date,
+                    (
+                        allocated +
+                        func.sum(page.c.remainder).over(
+                            order_by=(page.c.create_date, page.c.id)
+                        ) - page.c.remainder
+                    ).label('allocated_before')
+                ).order_by(page.c.create_date, page.c.id)
+            )).all()
+            needed = [row for row in rows if row.allocated_before < amount]
+            touched.extend(needed)
+            if len(rows) < limit or len(needed) < len(rows):
+                break
+            after = rows[-1]
+            allocated = (
+                after.allocated_before +
+                after.full_amount - after.invested_amount
+            )
+        return touched
+
+    async def bulk_update_investment(
+            self,
+            rows: list[dict],
+            session: AsyncSession
+    ) -> None:
+        """One executemany UPDATE of investment state for given rows.
+
+        Each row is a dict with `row_id`, `new_invested_amount`,
+        `new_fully_invested`, `new_close_date` and
+        `new_collection_seconds` keys.
+        """
+        if not rows:
+            return
+        table = self.model.__table__
+        await session.execute(
+            update(table).where(
+                table.c.id == bindparam('row_id')
+            ).values(
+                invested_amount=bindparam('new_invested_amount'),
+                fully_invested=bindparam('new_fully_invested'),
+                close_date=bindparam('new_close_date'),
+                collection_seconds=bindparam('new_collection_seconds')
+            ),
+            rows
+        )
+
+    async def bulk_update_remainders(
+            self,
+            rows: list[dict],
+            session: AsyncSession
+    ) -> int:
+        """Executemany UPDATE guarded by the previously known remainder.
+
+        Each row is a dict with `row_id`, `old_remainder`,
+        `new_remainder`, `new_fully_invested`, `new_close_date` and
+        `new_collection_seconds` keys.
+        Returns the number of updated rows, which is less than the
+        number of given rows if any of them was changed in the meantime.
+        """
+        if not rows:
+            return 0
+        table = self.model.__table__
+        result = await session.execute(
+            update(table).where(
+                table.c.id == bindparam('row_id'),
+                table.c.full_amount - table.c.invested_amount ==
+                bindparam('old_remainder')
+            ).values(
+                invested_amount=table.c.full_amount - bindparam(
+                    'new_remainder'
+                ),
+                fully_invested=bindparam('new_fully_invested'),
+                close_date=bindparam('new_close_date'),
+                collection_seconds=bindparam('new_collection_seconds')
+            ),
+            rows
+        )
+        return result.rowcount
@@ -1,8 +1,7 @@
-from typing import Optional
-
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import Constants
 from app.crud.base import CRUDBase
 from app.models.charity_project import CharityProject
 
@@ -10,31 +9,29 @@ from app.models.charity_project import CharityProject
 class CRUDCharityProject(CRUDBase):
 
     @staticmethod
-    async def get_project_by_name(
-            project_name: str,
+    async def get_occupied_names(
+            project_names: list[str],
             session: AsyncSession
-    ) -> Optional[int]:
-        charity_project = await session.execute(
-            select(CharityProject).where(
-                CharityProject.name == project_name)
+    ) -> set[str]:
+        occupied_names = await session.execute(
+            select(CharityProject.name).where(
+                CharityProject.name.in_(project_names)
+            )
         )
-        return charity_project.scalars().first()
+        return set(occupied_names.scalars().all())
 
     @staticmethod
     async def get_projects_by_completion_rate(
-            session: AsyncSession
+            session: AsyncSession,
+            limit: int = Constants.REPORT_TOP_SIZE
     ):
+        """Closed projects, the fastest collected first."""
         projects = await session.execute(
             select(CharityProject).where(
-                CharityProject.fully_invested.is_(True)
+                CharityProject.collection_seconds.isnot(None)
             ).order_by(
-                func.extract('year', CharityProject.close_date).desc(),
-                func.extract('month', CharityProject.close_date).desc(),
-                func.extract('day', CharityProject.close_date).desc(),
-                func.extract('hour', CharityProject.close_date).desc(),
-                func.extract('minute', CharityProject.close_date).desc(),
-                func.extract('second', CharityProject.close_date).desc(),
-            )
+                CharityProject.collection_seconds, CharityProject.id
+            ).limit(limit)
         )
         return projects.scalars().all()
 
@@ -1,4 +1,6 @@
-from sqlalchemy import select
+from typing import Optional, Sequence
+
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
@@ -17,5 +19,44 @@ class DonationCRUD(CRUDBase):
         )
         return user_donations.scalars().all()
 
+    async def get_user_donations_page(
+            self,
+            session: AsyncSession,
+            user: User,
+            limit: Optional[int],
+            after=None,
+            column_names: Optional[Sequence[str]] = None
+    ):
+        return await self.get_page(
+            session, limit, after, (Donation.user_id == user.id,),
+            column_names
+        )
+
+    @staticmethod
+    async def get_pending_ids(session: AsyncSession) -> list[int]:
+        pending_donations = await session.execute(
+            select(Donation.id).where(
+                Donation.allocation_pending.is_(True)
+            ).order_by(Donation.create_date, Donation.id)
+        )
+        return pending_donations.scalars().all()
+
+    @staticmethod
+    async def claim_pending(donation_id: int, session: AsyncSession) -> bool:
+        """Takes a deferred donation for allocation.
+
+        The flag is cleared by one conditional UPDATE, so of concurrent
+        claims, even from other processes, only one gets `True`.
+        """
+        claimed = await session.execute(
+            update(Donation).where(
+                Donation.id == donation_id,
+                Donation.allocation_pending.is_(True)
+            ).values(
+                allocation_pending=False
+            ).execution_options(synchronize_session=False)
+        )
+        return claimed.rowcount == 1
+
 
 donation_crud = DonationCRUD(Donation)
@@ -0,0 +1,44 @@
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import CRUDBase
+from app.models import Investment
+
+
+class InvestmentCRUD(CRUDBase):
+
+    @staticmethod
+    async def bulk_create(
+            transfers: list[dict],
+            session: AsyncSession
+    ) -> None:
+        """One executemany INSERT of `donation_id, project_id, amount`."""
+        if transfers:
+            await session.execute(insert(Investment), transfers)
+
+    @staticmethod
+    async def get_donation_investments(
+            donation_id: int,
+            session: AsyncSession
+    ):
+        investments = await session.execute(
+            select(Investment).where(
+                Investment.donation_id == donation_id
+            ).order_by(Investment.id)
+        )
+        return investments.scalars().all()
+
+    @staticmethod
+    async def get_project_investments(
+            project_id: int,
+            session: AsyncSession
+    ):
+        investments = await session.execute(
+            select(Investment).where(
+                Investment.project_id == project_id
+            ).order_by(Investment.id)
+        )
+        return investments.scalars().all()
+
+
+investment_crud = InvestmentCRUD(Investment)
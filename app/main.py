@@ -4,7 +4,13 @@ from fastapi import FastAPI
 
 from app.api.routers import main_router
 from app.core.config import settings
+from app.core.db import ReadPrimaryMiddleware
+from app.core.google_client import google_client
 from app.core.init_db import create_first_superuser
+from app.core.pool_metrics import PoolMetricsMiddleware
+from app.services.allocation_worker import allocation_worker
+from app.services.investment_func import resume_pending_allocations
+from app.services.ledger import warm_up_ledger
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,9 +23,24 @@ app = FastAPI(
     description=settings.app_description
 )
 
+app.add_middleware(ReadPrimaryMiddleware)
+app.add_middleware(PoolMetricsMiddleware)
+
 app.include_router(main_router)
 
 
 @app.on_event('startup')
 async def startup():
     await create_first_superuser()
+    if settings.investment_mode == 'ledger':
+        await warm_up_ledger()
+    if settings.allocation_worker_enabled:
+        await allocation_worker.start()
+    if settings.deferred_donation_allocation:
+        await resume_pending_allocations()
+
+
+@app.on_event('shutdown')
+async def shutdown():
+    await allocation_worker.stop()
+    await google_client.close()
@@ -1,4 +1,5 @@
 from app.models.base import InvestmentBaseModel  # noqa
 from app.models.charity_project import CharityProject  # noqa
 from app.models.donation import Donation  # noqa
+from app.models.investment import Investment  # noqa
 from app.models.user import User  # noqa
\ No newline at end of file
@@ -1,6 +1,8 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, CheckConstraint, Column, DateTime, Integer
+from sqlalchemy import (Boolean, CheckConstraint, Column, DateTime, Index,
+                        Integer)
+from sqlalchemy.orm import declared_attr
 
 from app.core.db import Base
 
@@ -12,10 +14,23 @@ class InvestmentBaseModel(Base):
     fully_invested = Column(Boolean, default=False)
     create_date = Column(DateTime, default=datetime.now)
     close_date = Column(DateTime)
-    __table_args__ = (
-        CheckConstraint('full_amount > 0'),
-        CheckConstraint('0 <= invested_amount <= full_amount')
-    )
+    collection_seconds = Column(Integer)
+
+    @declared_attr
+    def __table_args__(cls):
+        # FIFO allocation: `fully_invested = false ORDER BY create_date, id`,
+        # list pages: `ORDER BY create_date, id`.
+        return (
+            CheckConstraint('full_amount > 0'),
+            CheckConstraint('0 <= invested_amount <= full_amount'),
+            Index(
+                f'ix_{cls.__name__.lower()}_fully_invested_create_date',
+                'fully_invested', 'create_date', 'id'
+            ),
+            Index(
+                f'ix_{cls.__name__.lower()}_create_date', 'create_date', 'id'
+            ),
+        )
 
     def __repr__(self):
         return (
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text
+from sqlalchemy import Column, Index, String, Text
 
 from app.core.config import Constants
 from app.models.base import InvestmentBaseModel
@@ -14,3 +14,9 @@ class CharityProject(InvestmentBaseModel):
             f'Project description: {self.description}, '
             f'{super().__repr__()}'
         )
+
+
+Index(
+    'ix_charityproject_collection_seconds',
+    CharityProject.collection_seconds
+)
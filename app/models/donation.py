@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, Text
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, Text
 
 from app.models.base import InvestmentBaseModel
 
@@ -8,6 +8,7 @@ class Donation(InvestmentBaseModel):
                      ForeignKey('user.id', name='fk_donation_user_id_user'),
                      nullable=False)
     comment = Column(Text)
+    allocation_pending = Column(Boolean, default=False, nullable=False)
 
     def __repr__(self):
         return (
@@ -15,3 +16,13 @@ class Donation(InvestmentBaseModel):
             f'Comment: {self.comment}, '
             f'{super().__repr__()}'
         )
+
+
+Index(
+    'ix_donation_user_id_create_date',
+    Donation.user_id, Donation.create_date, Donation.id
+)
+Index(
+    'ix_donation_allocation_pending_create_date',
+    Donation.allocation_pending, Donation.create_date, Donation.id
+)
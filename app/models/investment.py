@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Integer
+
+from app.core.db import Base
+
+
+class Investment(Base):
+    """Append-only record of money moved from a donation to a project."""
+    donation_id = Column(
+        Integer,
+        ForeignKey('donation.id', name='fk_investment_donation_id_donation'),
+        nullable=False,
+        index=True
+    )
+    project_id = Column(
+        Integer,
+        ForeignKey(
+            'charityproject.id',
+            name='fk_investment_project_id_charityproject'
+        ),
+        nullable=False,
+        index=True
+    )
+    amount = Column(Integer, nullable=False)
+    create_date = Column(DateTime, default=datetime.now)
+    __table_args__ = (
+        CheckConstraint('amount > 0'),
+    )
+
+    def __repr__(self):
+        return (
+            f'Investment from Donation {self.donation_id} '
+            f'to Project {self.project_id}, '
+            f'Amount = {self.amount}, '
+            f'Created on - {self.create_date}'
+        )
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class ImportRowError(BaseModel):
+    line: int
+    detail: str
+
+
+class ImportReport(BaseModel):
+    created: int
+    errors: list[ImportRowError]
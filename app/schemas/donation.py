@@ -1,7 +1,9 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, Extra, PositiveInt
+from pydantic import BaseModel, Extra, PositiveInt, conlist
+
+from app.core.config import Constants
 
 
 class DonationBase(BaseModel):
@@ -16,6 +18,11 @@ class DonationCreate(DonationBase):
     pass
 
 
+DonationBulkCreate = conlist(
+    DonationCreate, min_items=1, max_items=Constants.BULK_MAX_SIZE
+)
+
+
 class DonationShortDB(DonationBase):
     id: int
     create_date: datetime
@@ -29,3 +36,10 @@ class DonationFullDB(DonationShortDB):
     invested_amount: int
     fully_invested: bool
     close_date: Optional[datetime]
+
+
+class DonationStatusDB(BaseModel):
+    id: int
+    status: str
+    invested_amount: int
+    fully_invested: bool
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Optional
+
+from app.models import InvestmentBaseModel
+
+
+def get_collection_seconds(
+        create_date: Optional[datetime],
+        close_date: Optional[datetime]
+) -> Optional[int]:
+    """Whole seconds an object took to get fully invested."""
+    if create_date is None or close_date is None:
+        return None
+    return int((close_date - create_date).total_seconds())
+
+
+class AllocationRecord:
+    """Plain investment state of a donation or a charity project.
+
+    The allocation core works on these records instead of SQLAlchemy
+    instances, so it has no per-attribute change tracking and can be
+    used without a session.
+    """
+    __slots__ = (
+        'id', 'full_amount', 'invested_amount', 'create_date', 'close_date'
+    )
+
+    def __init__(
+            self,
+            obj_id: int,
+            full_amount: int,
+            invested_amount: int,
+            create_date: Optional[datetime] = None,
+            close_date: Optional[datetime] = None
+    ):
+        self.id = obj_id
+        self.full_amount = full_amount
+        self.invested_amount = invested_amount
+        self.create_date = create_date
+        self.close_date = close_date
+
+    @classmethod
+    def from_model(cls, obj: InvestmentBaseModel) -> 'AllocationRecord':
+        return cls(
+            obj.id,
+            obj.full_amount,
+            obj.invested_amount,
+            obj.create_date,
+            obj.close_date
+        )
+
+    @property
+    def remainder(self) -> int:
+        return self.full_amount - self.invested_amount
+
+    @property
+    def fully_invested(self) -> bool:
+        return self.invested_amount == self.full_amount
+
+    @property
+    def collection_seconds(self) -> Optional[int]:
+        return get_collection_seconds(self.create_date, self.close_date)
+
+    def apply_to(self, obj: InvestmentBaseModel) -> InvestmentBaseModel:
+        obj.invested_amount = self.invested_amount
+        obj.fully_invested = self.fully_invested
+        if self.fully_invested:
+            obj.close_date = self.close_date
+            obj.collection_seconds = self.collection_seconds
+        return obj
+
+    def as_update(self) -> dict:
+        """Row for `CRUDBase.bulk_update_investment`."""
+        return {
+            'row_id': self.id,
+            'new_invested_amount': self.invested_amount,
+            'new_fully_invested': self.fully_invested,
+            'new_close_date': self.close_date,
+            'new_collection_seconds': self.collection_seconds,
+        }
+
+    def __repr__(self):
+        return (
+            f'Allocation record {self.id}, '
+            f'Full amount = {self.full_amount}, '
+            f'Invested amount = {self.invested_amount}, '
+            f'Created on - {self.create_date}, '
+            f'Closed on - {self.close_date}'
+        )
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import Constants, Messages
+from app.core.db import AsyncSessionLocal
+from app.services.ledger import open_pool_ledger
+
+Allocation = Callable[[AsyncSession], Awaitable[None]]
+
+
+class AllocationJob:
+    __slots__ = ('allocate', 'future')
+
+    def __init__(self, allocate: Allocation, future: asyncio.Future):
+        self.allocate = allocate
+        self.future = future
+
+
+class AllocationWorker:
+    """Single per-process consumer of allocation jobs.
+
+    Endpoints put jobs into a bounded queue and wait for their futures.
+    The worker takes up to `batch_size` queued jobs at once, allocates
+    them one after another in a single session and commits the whole
+    micro-batch in one transaction, so concurrent requests never race
+    on `invested_amount`. If the batch fails, its jobs are run again
+    one per transaction, so only the failing jobs get the error.
+    """
+
+    def __init__(
+            self,
+            session_factory: sessionmaker = AsyncSessionLocal,
+            queue_size: int = Constants.ALLOCATION_QUEUE_SIZE,
+            batch_size: int = Constants.ALLOCATION_BATCH_SIZE
+    ):
+        self.session_factory = session_factory
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    async def start(self) -> None:
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        while not self.queue.empty():
+            job = self.queue.get_nowait()
+            if not job.future.done():
+                job.future.set_exception(
+                    RuntimeError(Messages.ALLOCATION_WORKER_STOPPED)
+                )
+
+    async def submit(self, allocate: Allocation) -> None:
+        """Queues an allocation and waits until its batch is committed.
+
+        `allocate` gets the worker session and must not commit.
+        """
+        if not self.running:
+            raise RuntimeError(Messages.ALLOCATION_WORKER_STOPPED)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(AllocationJob(allocate, future))
+        await future
+
+    async def run(self) -> None:
+        while True:
+            jobs = [await self.queue.get()]
+            while len(jobs) < self.batch_size and not self.queue.empty():
+                jobs.append(self.queue.get_nowait())
+            await self.commit(jobs)
+
+    async def commit(self, jobs: list[AllocationJob]) -> None:
+        """Processes jobs in one transaction and resolves their futures."""
+        try:
+            await self.process(jobs)
+        except Exception as error:
+            logging.exception(Messages.INVESTMENT_ERROR)
+            if len(jobs) > 1:
+                for job in jobs:
+                    await self.commit([job])
+                return
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_exception(error)
+        else:
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_result(None)
+
+    async def process(self, jobs: list[AllocationJob]) -> None:
+        async with open_pool_ledger.lock:
+            try:
+                async with self.session_factory() as session:
+                    for job in jobs:
+                        await job.allocate(session)
+                    await session.commit()
+            finally:
+                open_pool_ledger.invalidate()
+
+
+allocation_worker = AllocationWorker()
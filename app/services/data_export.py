@@ -0,0 +1,45 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Sequence
+
+from app.core.config import Constants
+
+
+def to_json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+async def write_rows(
+        chunks: AsyncIterator[list],
+        fields: Sequence[str],
+        file_format: str
+) -> AsyncIterator[str]:
+    """Renders chunks of rows as CSV or NDJSON text, one piece per chunk.
+
+    Rows are tuples of values in the order of `fields`.
+    """
+    if file_format == Constants.EXPORT_FORMAT_CSV:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        async for chunk in chunks:
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        return
+    async for chunk in chunks:
+        yield ''.join(
+            json.dumps(
+                dict(zip(fields, row)),
+                ensure_ascii=False,
+                default=to_json_value
+            ) + '\n'
+            for row in chunk
+        )
@@ -0,0 +1,57 @@
+import csv
+import json
+from typing import IO, Iterator, Optional
+
+from app.core.config import Constants
+
+
+def is_decoded(text: str) -> bool:
+    """False if `text` keeps undecodable bytes as lone surrogates."""
+    try:
+        text.encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def read_rows(
+        stream: IO[str],
+        file_format: str
+) -> Iterator[tuple[int, Optional[dict]]]:
+    """Yields `(line number, row)` of a CSV or JSONL text stream.
+
+    Empty CSV cells are dropped, so optional fields get their defaults.
+    A row which cannot be parsed is yielded as `None`: a CSV row with
+    more cells than the header, invalid JSON or, when the stream is
+    decoded with `errors='surrogateescape'`, bytes which are not UTF-8.
+    """
+    if file_format == Constants.IMPORT_FORMAT_CSV:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if None in row or not all(
+                    is_decoded(key) and is_decoded(value or '')
+                    for key, value in row.items()
+            ):
+                yield reader.line_num, None
+                continue
+            yield reader.line_num, {
+                key: value for key, value in row.items() if value != ''
+            }
+        return
+    for line_num, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        if not is_decoded(line):
+            yield line_num, None
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            row = None
+        yield line_num, row if isinstance(row, dict) else None
+
+
+def guess_format(filename: str) -> str:
+    if filename.lower().endswith('.csv'):
+        return Constants.IMPORT_FORMAT_CSV
+    return Constants.IMPORT_FORMAT_JSONL
@@ -1,69 +1,380 @@
+from collections import deque
 from datetime import datetime
-from typing import Optional, Type, Union
+from typing import Iterable, Optional, Type, Union
 
-from sqlalchemy import select
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
 import app.services.validators as vld
+from app.core.config import Constants, Messages, settings
+from app.core.db import AsyncSessionLocal
+from app.crud.base import CRUDBase
 from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.crud.investment import investment_crud
 from app.models import CharityProject, Donation, InvestmentBaseModel, User
-from app.schemas.charity_project import CharityProjectDB, CharityProjectUpdate
+from app.schemas.charity_project import (CharityProjectCreate,
+                                         CharityProjectDB,
+                                         CharityProjectUpdate)
+from app.schemas.data_import import ImportReport, ImportRowError
+from app.schemas.donation import DonationCreate, DonationShortDB
+from app.services.allocation_record import (AllocationRecord,
+                                            get_collection_seconds)
+from app.services.allocation_worker import allocation_worker
+from app.services.ledger import LedgerEntry, open_pool_ledger
+from app.services.response_cache import response_cache
+
+CRUD_BY_MODEL = {
+    CharityProject: charity_project_crud,
+    Donation: donation_crud,
+}
 
 
 class InvestmentHandler:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, mode: Optional[str] = None):
         self.session = session
+        self.mode = mode or settings.investment_mode
+        self.transfers = []
+
+    def record_transfer(
+            self,
+            model_db: Type[Union[Donation, CharityProject]],
+            source_id: int,
+            recipient_id: int,
+            amount: int
+    ) -> None:
+        """Remembers money moved between a `model_db` object and another."""
+        if amount <= 0:
+            return
+        if model_db is Donation:
+            donation_id, project_id = source_id, recipient_id
+        else:
+            donation_id, project_id = recipient_id, source_id
+        self.transfers.append({
+            'donation_id': donation_id,
+            'project_id': project_id,
+            'amount': amount,
+        })
+
+    async def save_transfers(self) -> None:
+        """Writes remembered transfers to the investment ledger table."""
+        await investment_crud.bulk_create(self.transfers, self.session)
+        self.transfers = []
 
     @staticmethod
-    async def close_entity(obj: InvestmentBaseModel) -> InvestmentBaseModel:
-        obj.invested_amount = obj.full_amount
-        obj.fully_invested = True
-        obj.close_date = datetime.now()
-        return obj
+    def close_entity(
+            record: AllocationRecord,
+            now: Optional[datetime] = None
+    ) -> AllocationRecord:
+        record.invested_amount = record.full_amount
+        record.close_date = now or datetime.now()
+        return record
 
-    async def distribute(
+    def distribute(
             self,
-            recipient: InvestmentBaseModel,
-            source: InvestmentBaseModel
-    ) -> tuple[InvestmentBaseModel, InvestmentBaseModel]:
-        rem_recipient = recipient.full_amount - recipient.invested_amount
-        rem_source = source.full_amount - source.invested_amount
+            recipient: AllocationRecord,
+            source: AllocationRecord
+    ) -> int:
+        """Moves money from `source` to `recipient`, returns the amount."""
+        rem_recipient = recipient.remainder
+        rem_source = source.remainder
 
         if rem_recipient > rem_source:
             recipient.invested_amount += rem_source
-            source = await self.close_entity(source)
+            self.close_entity(source)
         elif rem_recipient == rem_source:
-            recipient = await self.close_entity(recipient)
-            source = await self.close_entity(source)
+            now = datetime.now()
+            self.close_entity(recipient, now)
+            self.close_entity(source, now)
         else:
             source.invested_amount += rem_recipient
-            recipient = await self.close_entity(recipient)
+            self.close_entity(recipient)
 
-        return recipient, source
+        return min(rem_recipient, rem_source)
 
     async def perform_investment(
             self,
             obj_in: InvestmentBaseModel,
             model_db: Type[Union[Donation, CharityProject]]
     ) -> InvestmentBaseModel:
-        result = await self.session.execute(
-            select(model_db).where(
-                model_db.fully_invested == False  # noqa: E712
-            ).order_by(model_db.create_date)
+        if self.mode == 'orm':
+            return await self.perform_investment_orm(obj_in, model_db)
+        if self.mode == 'ledger':
+            return await self.perform_investment_ledger(obj_in, model_db)
+        return await self.perform_investment_sql(obj_in, model_db)
+
+    async def allocate_records(
+            self,
+            records_in: list[AllocationRecord],
+            model_db: Type[Union[Donation, CharityProject]]
+    ) -> None:
+        """Allocates `records_in` in one FIFO pass over the open pool.
+
+        `records_in` must be ordered by creation. The open objects of
+        `model_db` are read in keyset batches only as far as needed and
+        written back with one bulk UPDATE.
+        """
+        pool = OpenPoolReader(CRUD_BY_MODEL[model_db], self.session)
+        for record in records_in:
+            while not record.fully_invested:
+                source = await pool.head()
+                if source is None:
+                    break
+                self.record_transfer(
+                    model_db, source.id, record.id,
+                    self.distribute(record, source)
+                )
+            if not record.fully_invested:
+                break
+        await pool.save()
+        await self.save_transfers()
+
+    async def distribute_many(
+            self,
+            objs_in: list[InvestmentBaseModel],
+            model_db: Type[Union[Donation, CharityProject]]
+    ) -> list[InvestmentBaseModel]:
+        """`allocate_records` for flushed objects."""
+        records = [AllocationRecord.from_model(obj_in) for obj_in in objs_in]
+        await self.allocate_records(records, model_db)
+        for record, obj_in in zip(records, objs_in):
+            record.apply_to(obj_in)
+        return objs_in
+
+    async def allocate_committed(
+            self,
+            model: Type[Union[Donation, CharityProject]],
+            obj_id: int
+    ) -> None:
+        """Allocates an already committed object."""
+        obj_in = await self.session.get(
+            model, obj_id, populate_existing=True
         )
-        sources = result.scalars().all()
+        if obj_in is None:
+            return
+        if model is Donation:
+            obj_in.allocation_pending = False
+        if obj_in.fully_invested:
+            return
+        await self.distribute_many(
+            [obj_in], Donation if model is CharityProject else CharityProject
+        )
+
+    async def allocate_pending(self, donation_id: int) -> None:
+        """Claims and allocates a deferred donation."""
+        if await donation_crud.claim_pending(donation_id, self.session):
+            await self.allocate_committed(Donation, donation_id)
+
+    async def allocate_open_pools(self) -> None:
+        """FIFO allocation of all open donations to all open projects."""
+        donations = OpenPoolReader(donation_crud, self.session)
+        projects = OpenPoolReader(charity_project_crud, self.session)
+        while True:
+            donation = await donations.head()
+            project = await projects.head() if donation else None
+            if project is None:
+                break
+            self.record_transfer(
+                Donation, donation.id, project.id,
+                self.distribute(project, donation)
+            )
+        await donations.save()
+        await projects.save()
+        await self.save_transfers()
+
+    async def perform_investment_sql(
+            self,
+            obj_in: InvestmentBaseModel,
+            model_db: Type[Union[Donation, CharityProject]]
+    ) -> InvestmentBaseModel:
+        """Set-based FIFO allocation.
+
+        Running totals of open remainders are computed in SQL, only the
+        rows needed to cover `obj_in` are fetched, and their new state is
+        written back with a single executemany UPDATE.
+        """
+        crud = CRUD_BY_MODEL[model_db]
+        recipient = AllocationRecord.from_model(obj_in)
+        rows = []
+        if recipient.remainder > 0:
+            rows = await crud.get_open_running_totals(
+                recipient.remainder, self.session
+            )
 
+        sources = [
+            AllocationRecord(
+                row.id, row.full_amount, row.invested_amount, row.create_date
+            )
+            for row in rows
+        ]
         for source in sources:
-            obj_in, source = await self.distribute(obj_in, source)
-            self.session.add(obj_in)
-            self.session.add(source)
+            self.record_transfer(
+                model_db, source.id, recipient.id,
+                self.distribute(recipient, source)
+            )
+        await crud.bulk_update_investment(
+            [source.as_update() for source in sources], self.session
+        )
+        await self.save_transfers()
 
+        self.session.add(recipient.apply_to(obj_in))
         await self.session.commit()
         await self.session.refresh(obj_in)
         return obj_in
 
+    @staticmethod
+    def get_remainder_update(
+            entry: LedgerEntry,
+            amount: int,
+            now: datetime
+    ) -> dict:
+        close_date = now if entry.remaining == amount else None
+        return {
+            'row_id': entry.id,
+            'old_remainder': entry.remaining,
+            'new_remainder': entry.remaining - amount,
+            'new_fully_invested': close_date is not None,
+            'new_close_date': close_date,
+            'new_collection_seconds': get_collection_seconds(
+                entry.create_date, close_date
+            ),
+        }
+
+    async def reclaim(self, obj_in: InvestmentBaseModel) -> bool:
+        """Claims a deferred donation again after a rollback."""
+        if not isinstance(obj_in, Donation) or not obj_in.allocation_pending:
+            return True
+        return await donation_crud.claim_pending(obj_in.id, self.session)
+
+    async def perform_investment_ledger(
+            self,
+            obj_in: InvestmentBaseModel,
+            model_db: Type[Union[Donation, CharityProject]]
+    ) -> InvestmentBaseModel:
+        """FIFO allocation planned on the in-process open pool ledger.
+
+        The database only receives the final writes. If any of them finds
+        a row changed behind the ledger's back, the transaction is rolled
+        back, the ledger is rebuilt and the allocation is planned again.
+        The rollback also drops the claim of a deferred donation, so it
+        is claimed again.
+        """
+        crud = CRUD_BY_MODEL[model_db]
+        async with open_pool_ledger.lock:
+            for _ in range(2):
+                if not open_pool_ledger.ready:
+                    await open_pool_ledger.rebuild(self.session)
+                recipient = AllocationRecord.from_model(obj_in)
+                allocation = open_pool_ledger.plan(
+                    model_db, recipient.remainder
+                )
+                now = datetime.now()
+                recipient.invested_amount += sum(
+                    amount for _, amount in allocation
+                )
+                updates = [
+                    self.get_remainder_update(entry, amount, now)
+                    for entry, amount in allocation
+                ]
+                updated = await crud.bulk_update_remainders(
+                    updates, self.session
+                )
+                if updated == len(updates):
+                    break
+                await self.session.rollback()
+                await self.session.refresh(obj_in)
+                open_pool_ledger.invalidate()
+                if not await self.reclaim(obj_in):
+                    return obj_in
+            else:
+                return await self.perform_investment_sql(obj_in, model_db)
+
+            for entry, amount in allocation:
+                self.record_transfer(model_db, entry.id, obj_in.id, amount)
+            await self.save_transfers()
+            if recipient.fully_invested:
+                self.close_entity(recipient, now)
+
+            self.session.add(recipient.apply_to(obj_in))
+            try:
+                await self.session.commit()
+            except Exception:
+                open_pool_ledger.invalidate()
+                raise
+            await self.session.refresh(obj_in)
+
+            open_pool_ledger.apply(model_db, allocation)
+            if recipient.remainder:
+                open_pool_ledger.push(
+                    type(obj_in),
+                    LedgerEntry(
+                        obj_in.id, recipient.remainder, obj_in.create_date
+                    )
+                )
+        return obj_in
+
+    async def perform_investment_orm(
+            self,
+            obj_in: InvestmentBaseModel,
+            model_db: Type[Union[Donation, CharityProject]]
+    ) -> InvestmentBaseModel:
+        """Reference allocation: `distribute` over open objects in FIFO order.
+
+        Open objects are read in small keyset batches and the scan stops
+        as soon as `obj_in` is fully invested.
+        """
+        await self.distribute_many([obj_in], model_db)
+        self.session.add(obj_in)
+        await self.session.commit()
+        await self.session.refresh(obj_in)
+        return obj_in
+
+
+class OpenPoolReader:
+    """Open objects of a model as records, read in keyset batches.
+
+    Records returned by `head` are remembered, so their new state can be
+    written back with one bulk UPDATE by `save`.
+    """
+
+    def __init__(self, crud: CRUDBase, session: AsyncSession):
+        self.crud = crud
+        self.session = session
+        self.batch = deque()
+        self.last_row = None
+        self.exhausted = False
+        self.touched = []
+
+    async def head(self) -> Optional[AllocationRecord]:
+        """The oldest record which is still open, None if there is none."""
+        while self.batch and self.batch[0].fully_invested:
+            self.batch.popleft()
+        if not self.batch and not self.exhausted:
+            rows = await self.crud.get_open_batch(
+                self.session, after=self.last_row
+            )
+            self.exhausted = len(rows) < Constants.INVESTMENT_BATCH_SIZE
+            if rows:
+                self.last_row = rows[-1]
+            self.batch.extend(AllocationRecord(*row) for row in rows)
+        if not self.batch:
+            return None
+        record = self.batch[0]
+        if not self.touched or self.touched[-1] is not record:
+            self.touched.append(record)
+        return record
+
+    async def save(self) -> None:
+        await self.crud.bulk_update_investment(
+            [record.as_update() for record in self.touched], self.session
+        )
+        self.touched = []
+
 
 class InvestmentService:
+    """Commits the allocations; `InvestmentHandler.allocate_*` never do."""
+
     def __init__(self, session: AsyncSession):
         self.session = session
         self.handler = InvestmentHandler(session)
@@ -73,15 +384,11 @@ class InvestmentService:
             obj_in,
             model,
             user: Optional[User] = None,
-            need_for_commit: bool = True
+            need_for_commit: bool = True,
+            defer_allocation: bool = False
     ) -> InvestmentBaseModel:
         obj_data = obj_in.dict()
 
-        if 'name' in obj_data:
-            await vld.check_charity_project_name_duplicate(
-                obj_data['name'], self.session
-            )
-
         if user is not None:
             obj_data['user_id'] = user.id
 
@@ -91,12 +398,172 @@ class InvestmentService:
             db_obj.invested_amount = 0
             db_obj.fully_invested = False
 
+        if defer_allocation:
+            db_obj.allocation_pending = True
+
         self.session.add(db_obj)
-        await self.session.commit()
+        if model is CharityProject:
+            async with vld.check_charity_project_name_unique(self.session):
+                await self.session.commit()
+        else:
+            await self.session.commit()
         await self.session.refresh(db_obj)
 
+        if defer_allocation:
+            return db_obj
+
+        if allocation_worker.running:
+            await allocation_worker.submit(
+                lambda session: InvestmentHandler(session).allocate_committed(
+                    model, db_obj.id
+                )
+            )
+            response_cache.bump()
+            await self.session.refresh(db_obj)
+            return db_obj
+
         model_in = Donation if model is CharityProject else CharityProject
-        return await self.handler.perform_investment(db_obj, model_in)
+        db_obj = await self.handler.perform_investment(db_obj, model_in)
+        response_cache.bump()
+        return db_obj
+
+    async def allocate_pending_donation(self, donation_id: int) -> None:
+        """Allocation of a donation created with `defer_allocation`.
+
+        The donation is claimed atomically and reloaded, so a repeated
+        or concurrent call never allocates it twice, and allocations
+        made since the request loaded it are taken into account.
+        """
+        if allocation_worker.running:
+            await allocation_worker.submit(
+                lambda session: InvestmentHandler(session).allocate_pending(
+                    donation_id
+                )
+            )
+            response_cache.bump()
+            return
+        if not await donation_crud.claim_pending(donation_id, self.session):
+            await self.session.rollback()
+            return
+        donation = await self.session.get(
+            Donation, donation_id, populate_existing=True
+        )
+        await self.handler.perform_investment(donation, CharityProject)
+        response_cache.bump()
+
+    async def create_donations_bulk(
+            self,
+            objs_in: list[DonationCreate],
+            user: User
+    ) -> list[DonationShortDB]:
+        """Inserts donations in chunks, allocates them and commits once."""
+        now = datetime.now()
+        donations = []
+        for start in range(0, len(objs_in), Constants.BULK_CHUNK_SIZE):
+            chunk = [
+                Donation(
+                    **obj_in.dict(),
+                    user_id=user.id,
+                    invested_amount=0,
+                    fully_invested=False,
+                    create_date=now
+                )
+                for obj_in in objs_in[start:start + Constants.BULK_CHUNK_SIZE]
+            ]
+            self.session.add_all(chunk)
+            await self.session.flush()
+            donations.extend(chunk)
+
+        async with open_pool_ledger.lock:
+            await self.handler.distribute_many(donations, CharityProject)
+            results = [
+                DonationShortDB.from_orm(donation) for donation in donations
+            ]
+            await self.session.commit()
+            open_pool_ledger.invalidate()
+        response_cache.bump()
+        return results
+
+    async def import_objects(
+            self,
+            rows: Iterable[tuple[int, Optional[dict]]],
+            model: Type[Union[Donation, CharityProject]],
+            user: Optional[User] = None
+    ) -> ImportReport:
+        """Validates and inserts rows in chunks, then allocates once.
+
+        Invalid rows are reported and skipped, the rest is committed
+        in a single transaction.
+        """
+        schema = CharityProjectCreate if model is CharityProject else (
+            DonationCreate
+        )
+        now = datetime.now()
+        report = ImportReport(created=0, errors=[])
+        seen_names = set()
+        chunk = []
+        for line, row in rows:
+            if row is None:
+                report.errors.append(ImportRowError(
+                    line=line, detail=Messages.IMPORT_MALFORMED_ROW
+                ))
+                continue
+            try:
+                obj_data = schema.parse_obj(row).dict()
+            except (ValidationError, TypeError) as error:
+                report.errors.append(
+                    ImportRowError(line=line, detail=str(error))
+                )
+                continue
+            if model is CharityProject:
+                if obj_data['name'] in seen_names:
+                    report.errors.append(ImportRowError(
+                        line=line, detail=Messages.PROJECT_NAME_OCCUPIED
+                    ))
+                    continue
+                seen_names.add(obj_data['name'])
+            if user is not None:
+                obj_data['user_id'] = user.id
+            chunk.append((line, model(
+                **obj_data,
+                invested_amount=0,
+                fully_invested=False,
+                create_date=now
+            )))
+            if len(chunk) == Constants.BULK_CHUNK_SIZE:
+                await self._insert_chunk(chunk, model, report)
+                chunk = []
+        await self._insert_chunk(chunk, model, report)
+        report.errors.sort(key=lambda error: error.line)
+
+        async with open_pool_ledger.lock:
+            await self.handler.allocate_open_pools()
+            await self.session.commit()
+            open_pool_ledger.invalidate()
+        response_cache.bump()
+        return report
+
+    async def _insert_chunk(
+            self,
+            chunk: list[tuple[int, InvestmentBaseModel]],
+            model: Type[Union[Donation, CharityProject]],
+            report: ImportReport
+    ) -> None:
+        if model is CharityProject and chunk:
+            occupied = await charity_project_crud.get_occupied_names(
+                [obj.name for _, obj in chunk], self.session
+            )
+            for line, obj in chunk:
+                if obj.name in occupied:
+                    report.errors.append(ImportRowError(
+                        line=line, detail=Messages.PROJECT_NAME_OCCUPIED
+                    ))
+            chunk = [
+                (line, obj) for line, obj in chunk if obj.name not in occupied
+            ]
+        self.session.add_all([obj for _, obj in chunk])
+        await self.session.flush()
+        report.created += len(chunk)
 
     async def update_charity_project(
             self,
@@ -111,21 +578,32 @@ class InvestmentService:
                 obj_in.full_amount
             )
 
-        if obj_in.name:
-            await vld.check_charity_project_name_duplicate(
-                obj_in.name, self.session
-            )
-
         if (obj_in.full_amount is not None and
                 obj_in.full_amount == charity_project.invested_amount):
             charity_project.fully_invested = True
             charity_project.close_date = datetime.now()
+            charity_project.collection_seconds = get_collection_seconds(
+                charity_project.create_date, charity_project.close_date
+            )
 
         update_data = obj_in.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(charity_project, field, value)
 
-        return await charity_project_crud.update(charity_project, self.session)
+        async with vld.check_charity_project_name_unique(self.session):
+            charity_project = await charity_project_crud.update(
+                charity_project, self.session
+            )
+        response_cache.bump()
+        if self.handler.mode == 'ledger':
+            async with open_pool_ledger.lock:
+                open_pool_ledger.update(
+                    CharityProject,
+                    charity_project.id,
+                    charity_project.full_amount -
+                    charity_project.invested_amount
+                )
+        return charity_project
 
     async def remove_charity_project(
             self,
@@ -133,4 +611,23 @@ class InvestmentService:
     ) -> CharityProjectDB:
         await vld.check_charity_project_is_open(charity_project)
         await vld.check_charity_project_invested(charity_project)
-        return await charity_project_crud.remove(charity_project, self.session)
+        project_id = charity_project.id
+        charity_project = await charity_project_crud.remove(
+            charity_project, self.session
+        )
+        response_cache.bump()
+        if self.handler.mode == 'ledger':
+            async with open_pool_ledger.lock:
+                open_pool_ledger.discard(CharityProject, project_id)
+        return charity_project
+
+
+async def resume_pending_allocations(
+        session_factory: sessionmaker = AsyncSessionLocal
+) -> None:
+    """Allocates deferred donations left pending by a previous run."""
+    async with session_factory() as session:
+        donation_ids = await donation_crud.get_pending_ids(session)
+        invest_object = InvestmentService(session)
+        for donation_id in donation_ids:
+            await invest_object.allocate_pending_donation(donation_id)
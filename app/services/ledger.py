@@ -0,0 +1,131 @@
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Type, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionLocal
+from app.models import CharityProject, Donation
+
+
+class LedgerEntry:
+    __slots__ = ('id', 'remaining', 'create_date')
+
+    def __init__(self, obj_id: int, remaining: int, create_date: datetime):
+        self.id = obj_id
+        self.remaining = remaining
+        self.create_date = create_date
+
+    def __repr__(self):
+        return (
+            f'Ledger entry {self.id}, '
+            f'Remaining = {self.remaining}, '
+            f'Created on - {self.create_date}'
+        )
+
+
+class OpenPoolLedger:
+    """Process-local FIFO queues of open donations and charity projects.
+
+    The ledger mirrors the open pool in the database, so the allocation
+    decision does not need to query it. It is only consistent while this
+    process is the single writer of donations and projects; `rebuild`
+    reloads it from the database at any time.
+    """
+
+    def __init__(self):
+        self.pools = {CharityProject: deque(), Donation: deque()}
+        self.ready = False
+        self.lock = asyncio.Lock()
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        for model, pool in self.pools.items():
+            open_objects = await session.execute(
+                select(
+                    model.id,
+                    model.full_amount - model.invested_amount,
+                    model.create_date
+                ).where(
+                    model.fully_invested == False  # noqa: E712
+                ).order_by(model.create_date, model.id)
+            )
+            pool.clear()
+            pool.extend(LedgerEntry(*row) for row in open_objects.all())
+        self.ready = True
+
+    def invalidate(self) -> None:
+        self.ready = False
+
+    def plan(
+            self,
+            model: Type[Union[Donation, CharityProject]],
+            amount: int
+    ) -> list[tuple[LedgerEntry, int]]:
+        """Entries of `model` pool covering `amount`, with amounts taken.
+
+        The ledger itself is not changed until `apply` is called.
+        """
+        allocation = []
+        for entry in self.pools[model]:
+            if amount == 0:
+                break
+            taken = min(entry.remaining, amount)
+            allocation.append((entry, taken))
+            amount -= taken
+        return allocation
+
+    def apply(
+            self,
+            model: Type[Union[Donation, CharityProject]],
+            allocation: list[tuple[LedgerEntry, int]]
+    ) -> None:
+        pool = self.pools[model]
+        for entry, taken in allocation:
+            entry.remaining -= taken
+        while pool and pool[0].remaining == 0:
+            pool.popleft()
+
+    def push(
+            self,
+            model: Type[Union[Donation, CharityProject]],
+            entry: LedgerEntry
+    ) -> None:
+        pool = self.pools[model]
+        if pool and pool[-1].create_date > entry.create_date:
+            self.invalidate()
+            return
+        pool.append(entry)
+
+    def update(
+            self,
+            model: Type[Union[Donation, CharityProject]],
+            obj_id: int,
+            remaining: int
+    ) -> None:
+        pool = self.pools[model]
+        for entry in pool:
+            if entry.id == obj_id:
+                entry.remaining = remaining
+                break
+        if remaining == 0:
+            self.discard(model, obj_id)
+
+    def discard(
+            self,
+            model: Type[Union[Donation, CharityProject]],
+            obj_id: int
+    ) -> None:
+        pool = self.pools[model]
+        self.pools[model] = deque(
+            entry for entry in pool if entry.id != obj_id
+        )
+
+
+open_pool_ledger = OpenPoolLedger()
+
+
+async def warm_up_ledger() -> None:
+    async with AsyncSessionLocal() as session:
+        await open_pool_ledger.rebuild(session)
@@ -0,0 +1,59 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import Constants
+
+
+class CachedResponse:
+    __slots__ = ('version', 'body', 'etag', 'headers')
+
+    def __init__(self, version: int, body: bytes, headers: dict[str, str]):
+        self.version = version
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.headers = headers
+
+
+class ResponseCache:
+    """Serialized responses valid for one version of the data.
+
+    Every write that changes what read endpoints return must `bump` the
+    version; entries built from an older version are never served. The
+    version is process-local, so each worker process keeps its own cache.
+    """
+
+    def __init__(self, max_size: int = Constants.RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self.version = 0
+        self.entries: OrderedDict[str, CachedResponse] = OrderedDict()
+
+    def bump(self) -> None:
+        self.version += 1
+        self.entries.clear()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.entries.get(key)
+        if entry is None or entry.version != self.version:
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(
+            self,
+            key: str,
+            version: int,
+            body: bytes,
+            headers: dict[str, str]
+    ) -> CachedResponse:
+        """Stores a response built while the data had `version`."""
+        entry = CachedResponse(version, body, headers)
+        if version == self.version:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return entry
+
+
+response_cache = ResponseCache()
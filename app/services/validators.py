@@ -1,21 +1,44 @@
+from contextlib import asynccontextmanager
 from http import HTTPStatus
+from typing import AsyncIterator
 
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-import app.crud.charity_project as cp
 from app.core.config import Messages
 from app.models import CharityProject
 
 
-async def check_charity_project_name_duplicate(
-        project_name: str,
-        session: AsyncSession
-) -> None:
-    charity_project = await cp.charity_project_crud.get_project_by_name(
-        project_name, session
+def is_name_violation(error: IntegrityError) -> bool:
+    """Whether `error` is the unique constraint on `CharityProject.name`.
+
+    SQLite names the column in the message, PostgreSQL the constraint.
+    """
+    table = CharityProject.__table__.name
+    message = str(error.orig)
+    return (
+        f'UNIQUE constraint failed: {table}.name' in message or
+        f'"{table}_name_key"' in message
     )
-    if charity_project:
+
+
+@asynccontextmanager
+async def check_charity_project_name_unique(
+        session: AsyncSession
+) -> AsyncIterator[None]:
+    """Reports a project name taken on commit as `PROJECT_NAME_OCCUPIED`.
+
+    The unique constraint on `CharityProject.name` is the check itself,
+    so two concurrent requests cannot both get the same name. Other
+    integrity errors are raised as they are.
+    """
+    try:
+        yield
+    except IntegrityError as error:
+        await session.rollback()
+        if not is_name_violation(error):
+            raise
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail=Messages.PROJECT_NAME_OCCUPIED
@@ -0,0 +1,69 @@
+"""Cold import of the application against a time budget.
+
+    python -m benchmarks.import_time [--budget-ms 1000] [--top 15]
+
+Runs `python -X importtime -c "import app.main"` in fresh interpreters,
+prints the slowest modules by cumulative time of the median run and
+exits with status 1 when the whole import exceeds the budget or pulls
+in a module that should only load on first use.
+"""
+import argparse
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_MS = 1000
+LAZY_MODULES = ('aiogoogle', 'aiohttp')
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Self and cumulative microseconds of every imported module."""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.import_time')
+    parser.add_argument('--budget-ms', type=int, default=IMPORT_TIME_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    runs = sorted(
+        (import_times('app.main') for _ in range(args.runs)),
+        key=lambda times: times['app.main'][1]
+    )
+    times = runs[len(runs) // 2]
+    for name, (self_us, cumulative_us) in sorted(
+            times.items(), key=lambda item: item[1][1], reverse=True
+    )[:args.top]:
+        print(
+            f'{cumulative_us / 1000:8.1f} ms '
+            f'{self_us / 1000:8.1f} ms  {name}'
+        )
+    loaded = [
+        name for name in LAZY_MODULES
+        if any(module.split('.')[0] == name for module in times)
+    ]
+    total_ms = times['app.main'][1] / 1000
+    print(
+        f'app.main: {total_ms:.1f} ms (median of {args.runs}, '
+        f'min {runs[0]["app.main"][1] / 1000:.1f} ms), '
+        f'budget {args.budget_ms} ms'
+    )
+    if loaded:
+        print(f'Imported eagerly: {", ".join(loaded)}')
+    if total_ms > args.budget_ms or loaded:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Rows per second of the donation list: ORM + pydantic vs columns + orjson.
+
+    python -m benchmarks.list_serialization [--rows 10000 100000]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.api.utils import get_rows_content, get_schema_columns
+from app.core.db import Base
+from app.crud.donation import donation_crud
+from app.models import Donation
+from app.schemas.donation import DonationFullDB
+
+RESPONSE_FIELD = create_response_field(
+    name='Response', type_=list[DonationFullDB]
+)
+
+
+async def fill(session: AsyncSession, rows: int) -> None:
+    start = datetime(2020, 1, 1)
+    await session.execute(insert(Donation), [
+        {
+            'user_id': 1,
+            'full_amount': 100 + number % 1000,
+            'invested_amount': number % 100,
+            'fully_invested': False,
+            'comment': f'Donation number {number}' * 5,
+            'create_date': start + timedelta(seconds=number),
+        }
+        for number in range(rows)
+    ])
+    await session.commit()
+
+
+async def orm_response(session: AsyncSession) -> bytes:
+    """The previous path: entities validated through `response_model`."""
+    donations = await donation_crud.get_page(session, None)
+    content = await serialize_response(
+        field=RESPONSE_FIELD, response_content=donations, exclude_none=True
+    )
+    return JSONResponse(content).body
+
+
+async def rows_response(session: AsyncSession) -> bytes:
+    rows = await donation_crud.get_page(
+        session, None, column_names=get_schema_columns(DonationFullDB)
+    )
+    return ORJSONResponse(get_rows_content(rows)).body
+
+
+async def measure(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(directory) / "bench.db"}'
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as session:
+            await fill(session, rows)
+        for name, build in (('orm', orm_response), ('rows', rows_response)):
+            async with AsyncSession(engine) as session:
+                started = time.perf_counter()
+                body = await build(session)
+                elapsed = time.perf_counter() - started
+            print(
+                f'{rows:>7} rows  {name:<5} {elapsed:7.3f} s  '
+                f'{rows / elapsed:>10.0f} rows/s  {len(body)} bytes'
+            )
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.list_serialization'
+    )
+    parser.add_argument(
+        '--rows', type=int, nargs='+', default=[10_000, 100_000]
+    )
+    for rows in parser.parse_args().rows:
+        asyncio.run(measure(rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Event loop lag during a burst of logins: inline bcrypt vs thread pool.
+
+    python -m benchmarks.login_loop_lag [--logins 20] [--rounds 12]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi_users.password import PasswordHelper
+
+from app.core.config import settings
+from app.core.user import AsyncPasswordHelper
+
+TICK = 0.005
+
+
+async def measure_lag(stop: asyncio.Event, lags: list[float]) -> None:
+    """Lateness of a periodic timer, as seen by any other request."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def burst(helper: PasswordHelper, hashed: str, logins: int) -> None:
+    async def inline_login():
+        helper.verify_and_update('chimichangas4life', hashed)
+
+    async def offloaded_login():
+        await helper.verify_and_update_async('chimichangas4life', hashed)
+
+    login = (
+        offloaded_login if isinstance(helper, AsyncPasswordHelper)
+        else inline_login
+    )
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def run(name: str, helper: PasswordHelper, logins: int) -> None:
+    hashed = helper.hash('chimichangas4life')
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+    await asyncio.sleep(TICK * 4)
+    started = time.perf_counter()
+    await burst(helper, hashed, logins)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    print(
+        f'{name:<9} {logins} logins in {elapsed:6.3f} s  '
+        f'loop lag max {max(lags) * 1000:8.1f} ms  '
+        f'median {statistics.median(lags) * 1000:6.1f} ms'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.login_loop_lag'
+    )
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument(
+        '--rounds', type=int, default=settings.password_hash_rounds
+    )
+    args = parser.parse_args()
+    helper = AsyncPasswordHelper(args.rounds)
+    asyncio.run(run('inline', PasswordHelper(helper.context), args.logins))
+    asyncio.run(run('executor', helper, args.logins))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Requests per second with a small pool: eager vs lazy connection checkout.
+
+    python -m benchmarks.session_checkouts [--requests 3000] [--pool-size 2]
+
+Eager sessions take a connection as soon as the dependency opens them,
+lazy ones on their first query. Two thirds of the mix never query: the
+cached project list and a donation rejected by validation.
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    create_async_engine)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+from app.core.db import Base, get_async_session
+from app.core.pool_metrics import pool_metrics
+from app.core.user import current_user
+from app.main import app
+from app.models import CharityProject, Donation, User
+
+REQUESTS = (
+    ('GET', '/charity_project/', None),
+    ('POST', '/donation/', {'full_amount': -1}),
+    ('GET', '/donation/my', None),
+)
+
+
+async def fill(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(CharityProject), [
+            {
+                'name': f'Project {number}',
+                'description': 'For chimichangas',
+                'full_amount': 1000,
+                'invested_amount': 0,
+                'fully_invested': False,
+                'create_date': datetime(2020, 1, 1),
+            }
+            for number in range(100)
+        ])
+        await conn.execute(insert(Donation), [
+            {
+                'user_id': 1,
+                'full_amount': 100,
+                'invested_amount': 0,
+                'fully_invested': False,
+                'create_date': datetime(2020, 1, 1),
+            }
+            for _ in range(100)
+        ])
+
+
+async def measure(
+        name: str, engine: AsyncEngine, requests: int, concurrency: int
+) -> None:
+    async def get_session():
+        async with AsyncSession(engine) as session:
+            if name == 'eager':
+                await session.connection()
+            yield session
+
+    async def worker(numbers: range) -> None:
+        for number in numbers:
+            method, url, json = REQUESTS[number % len(REQUESTS)]
+            await client.request(method, url, json=json)
+
+    app.dependency_overrides[get_async_session] = get_session
+    pool_metrics.reset()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+            transport=transport, base_url='http://test'
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(range(start, requests, concurrency))
+            for start in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    stats = pool_metrics.stats
+    print(
+        f'{name:<5} {requests / elapsed:>7.0f} req/s  '
+        f'checkouts {stats["checkouts"]:>5}  '
+        f'checked out {stats["held_seconds"]:6.2f} s'
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(directory) / "bench.db"}',
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=args.pool_size,
+            max_overflow=0
+        )
+        pool_metrics.watch(engine)
+        await fill(engine)
+        for name in ('eager', 'lazy'):
+            await measure(name, engine, args.requests, args.concurrency)
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.session_checkouts'
+    )
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--pool-size', type=int, default=2)
+    args = parser.parse_args()
+    settings.pool_metrics_enabled = True
+    logging.disable(logging.INFO)
+    settings.response_cache_enabled = True
+    app.dependency_overrides[current_user] = lambda: User(
+        id=1, is_active=True, is_verified=True, is_superuser=False
+    )
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Mixed read/write throughput: default SQLite engine vs tuned profile.
+
+    python -m benchmarks.sqlite_engine_profile [--seconds 5] [--readers 8]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    create_async_engine)
+
+from app.core.db import Base, create_engine
+from app.crud.donation import donation_crud
+from app.models import Donation
+
+SEED_ROWS = 20_000
+PAGE_SIZE = 100
+
+
+class Counters:
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.locked = 0
+
+
+def donation_row(number: int) -> dict:
+    return {
+        'user_id': 1,
+        'full_amount': 100 + number % 1000,
+        'invested_amount': 0,
+        'fully_invested': False,
+        'comment': f'Donation number {number}',
+        'create_date': datetime(2020, 1, 1) + timedelta(seconds=number),
+    }
+
+
+async def reader(
+        engine: AsyncEngine, deadline: float, counters: Counters
+) -> None:
+    while time.perf_counter() < deadline:
+        try:
+            async with AsyncSession(engine) as session:
+                await donation_crud.get_page(session, PAGE_SIZE)
+            counters.reads += 1
+        except OperationalError:
+            counters.locked += 1
+
+
+async def writer(
+        engine: AsyncEngine, deadline: float, counters: Counters
+) -> None:
+    number = SEED_ROWS
+    while time.perf_counter() < deadline:
+        number += 1
+        try:
+            async with AsyncSession(engine) as session:
+                await session.execute(insert(Donation), [donation_row(number)])
+                await session.commit()
+            counters.writes += 1
+        except OperationalError:
+            counters.locked += 1
+
+
+async def measure(
+        name: str, engine: AsyncEngine, seconds: float, readers: int
+) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Donation), [donation_row(number)
+                               for number in range(SEED_ROWS)]
+        )
+    counters = Counters()
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(
+        writer(engine, deadline, counters),
+        *(reader(engine, deadline, counters) for _ in range(readers))
+    )
+    await engine.dispose()
+    print(
+        f'{name:<7} reads {counters.reads / seconds:>8.0f}/s  '
+        f'writes {counters.writes / seconds:>7.0f}/s  '
+        f'locked errors {counters.locked}'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.sqlite_engine_profile'
+    )
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        for name, build in (
+                ('default', create_async_engine),
+                ('tuned', create_engine),
+        ):
+            url = f'sqlite+aiosqlite:///{Path(directory) / name}.db'
+            asyncio.run(measure(name, build(url), args.seconds, args.readers))
+
+
+if __name__ == '__main__':
+    main()
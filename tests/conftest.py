@@ -3,7 +3,7 @@ from pathlib import Path
 import pytest
 import pytest_asyncio
 from mixer.backend.sqlalchemy import Mixer as _mixer
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -48,6 +48,7 @@ BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 pytest_plugins = [
     'fixtures.user',
     'fixtures.data',
+    'fixtures.google',
 ]
 
 TEST_DB = BASE_DIR / 'test.db'
@@ -80,3 +81,19 @@ def mixer():
     mixer_engine = create_engine(f'sqlite:///{str(TEST_DB)}')
     session = sessionmaker(bind=mixer_engine)
     return _mixer(session=session(), commit=True)
+
+
+@pytest.fixture
+def statements():
+    """SQL statements executed by the test engine during the test.
+
+    Clear the list right before the part of the test being measured.
+    """
+    captured = []
+
+    def capture(conn, cursor, statement, *args):
+        captured.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    yield captured
+    event.remove(engine.sync_engine, 'before_cursor_execute', capture)
@@ -0,0 +1,141 @@
+import json
+
+import pytest_asyncio
+from aiogoogle.auth.creds import ServiceAccountCreds
+from aiohttp import web
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.core import google_client
+
+
+def path_parameters(*names):
+    return {
+        name: {'type': 'string', 'location': 'path', 'required': True}
+        for name in names
+    }
+
+
+def query_parameters(*names):
+    return {name: {'type': 'string', 'location': 'query'} for name in names}
+
+
+def method(http_method, path, parameters=None, order=()):
+    return {
+        'httpMethod': http_method,
+        'path': path,
+        'flatPath': path,
+        'parameters': parameters or {},
+        'parameterOrder': list(order),
+    }
+
+
+def discovery_document(name, version, root_url, service_path, resources):
+    return {
+        'kind': 'discovery#restDescription',
+        'name': name,
+        'version': version,
+        'rootUrl': root_url,
+        'servicePath': service_path,
+        'batchPath': 'batch',
+        'parameters': {},
+        'schemas': {},
+        'resources': resources,
+    }
+
+
+def sheets_document(root_url):
+    return discovery_document('sheets', 'v4', root_url, '', {
+        'spreadsheets': {
+            'methods': {'create': method('POST', 'v4/spreadsheets')},
+        },
+    })
+
+
+def drive_document(root_url):
+    return discovery_document('drive', 'v3', root_url, 'drive/v3/', {
+        'permissions': {'methods': {
+            'create': method(
+                'POST', 'files/{fileId}/permissions',
+                {**path_parameters('fileId'), **query_parameters('fields')},
+                ['fileId']
+            ),
+        }},
+    })
+
+
+class FakeGoogle:
+    """Local Sheets, Drive and OAuth token endpoints recording requests."""
+
+    def __init__(self):
+        self.requests = []
+        self.app = web.Application()
+        self.app.router.add_route('*', '/{tail:.*}', self.handle)
+
+    def count(self, method, path_part=''):
+        return sum(
+            1 for request_method, path, _ in self.requests
+            if request_method == method and path_part in path
+        )
+
+    async def handle(self, request):
+        body = await request.read()
+        self.requests.append((request.method, request.path, body))
+        if request.path == '/token':
+            return web.json_response(
+                {'access_token': 'token', 'expires_in': 3600}
+            )
+        if request.method == 'POST' and request.path == '/v4/spreadsheets':
+            return web.json_response({'spreadsheetId': 'sheet'})
+        return web.json_response({'id': 'id'})
+
+
+def service_account_info(token_uri):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return {
+        'type': 'service_account',
+        'project_id': 'qrkot',
+        'private_key_id': 'key',
+        'private_key': key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ).decode(),
+        'client_email': 'qrkot@qrkot.iam.gserviceaccount.com',
+        'client_id': '1',
+        'auth_uri': token_uri,
+        'token_uri': token_uri,
+        'auth_provider_x509_cert_url': token_uri,
+        'client_x509_cert_url': token_uri,
+    }
+
+
+@pytest_asyncio.fixture
+async def fake_google(monkeypatch, tmp_path):
+    """Google client talking to a local fake server.
+
+    Discovery documents pointing at the fake server are put into the
+    on-disk discovery cache beforehand.
+    """
+    fake = FakeGoogle()
+    runner = web.AppRunner(fake.app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    root_url = f'http://127.0.0.1:{runner.addresses[0][1]}/'
+    for name, document in (
+            ('sheets.v4', sheets_document(root_url)),
+            ('drive.v3', drive_document(root_url)),
+    ):
+        (tmp_path / f'{name}.json').write_text(json.dumps(document))
+    credentials = ServiceAccountCreds(
+        scopes=google_client.SCOPES,
+        **service_account_info(f'{root_url}token')
+    )
+    monkeypatch.setattr(
+        google_client.settings, 'google_discovery_cache_dir', str(tmp_path)
+    )
+    monkeypatch.setattr(google_client, 'get_credentials', lambda: credentials)
+    yield fake
+    await google_client.google_client.close()
+    await runner.cleanup()
@@ -1,4 +1,16 @@
+from contextlib import asynccontextmanager
+
+from conftest import TestingSessionLocal, override_db
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import func, select
+
+from app.core import init_db
+from app.core.user import (AsyncPasswordHelper, CachedUserDatabase,
+                           UserManager, password_helper, user_cache)
+from app.models import User
+
 REGISTER_URL = '/auth/register'
+USER_CACHE_URL = '/users/cache'
 
 
 def test_register(test_client):
@@ -49,3 +61,87 @@ def test_register_invalid_pass(user_client):
         'Убедитесь, что в ответе на некорректный POST-запрос '
         f'к эндпоинту `{REGISTER_URL}` есть ключ `detail`.'
     )
+
+
+async def test_user_cache(statements):
+    async with TestingSessionLocal() as session:
+        session.add(User(
+            id=5, email='cached@pool.com', hashed_password='hash',
+            is_active=True, is_superuser=False, is_verified=False,
+        ))
+        await session.commit()
+    user_cache.clear()
+
+    statements.clear()
+    for _ in range(3):
+        async with TestingSessionLocal() as session:
+            user = await CachedUserDatabase(session, User).get(5)
+            assert user.email == 'cached@pool.com'
+    assert len(statements) == 1, (
+        'Пользователь должен читаться из базы данных только при промахе кэша.'
+    )
+    assert user_cache.stats == {'hits': 2, 'misses': 1, 'size': 1}
+
+    async with TestingSessionLocal() as session:
+        user_db = CachedUserDatabase(session, User)
+        await user_db.update(await user_db.get(5), {'is_active': False})
+    async with TestingSessionLocal() as session:
+        user = await CachedUserDatabase(session, User).get(5)
+    assert not user.is_active, (
+        'После изменения пользователя кэш должен сбрасываться.'
+    )
+    assert user_cache.stats['misses'] == 2
+    user_cache.clear()
+
+
+def test_user_cache_stats(superuser_client):
+    response = superuser_client.get(USER_CACHE_URL)
+    assert response.status_code == 200
+    assert set(response.json()) == {'hits', 'misses', 'size'}
+
+
+async def test_login_upgrades_password_hash():
+    old_hash = AsyncPasswordHelper(rounds=4).hash('chimichangas4life')
+    async with TestingSessionLocal() as session:
+        session.add(User(
+            email='dead@pool.com', hashed_password=old_hash,
+            is_active=True, is_superuser=False, is_verified=False,
+        ))
+        await session.commit()
+        user_manager = UserManager(
+            CachedUserDatabase(session, User), AsyncPasswordHelper(rounds=5)
+        )
+        user = await user_manager.authenticate(OAuth2PasswordRequestForm(
+            username='dead@pool.com', password='wrong', scope=''
+        ))
+        assert user is None
+        user = await user_manager.authenticate(OAuth2PasswordRequestForm(
+            username='dead@pool.com', password='chimichangas4life', scope=''
+        ))
+    assert user is not None
+    assert user.hashed_password.startswith('$2b$05$'), (
+        'При входе хэш пароля должен обновляться до заданной '
+        'сложности bcrypt.'
+    )
+
+
+async def test_create_user_skips_hashing_existing(monkeypatch):
+    hashed = []
+
+    async def hash_async(password):
+        hashed.append(password)
+        return AsyncPasswordHelper(rounds=4).hash(password)
+
+    monkeypatch.setattr(
+        init_db, 'get_async_session_context', asynccontextmanager(override_db)
+    )
+    monkeypatch.setattr(password_helper, 'hash_async', hash_async)
+    await init_db.create_user('dead@pool.com', 'chimichangas4life', True)
+    await init_db.create_user('dead@pool.com', 'chimichangas4life', True)
+    async with TestingSessionLocal() as session:
+        users = await session.scalar(select(func.count(User.id)))
+    assert users == 1
+    assert len(hashed) == 1, (
+        'Пароль уже существующего суперпользователя не должен хэшироваться '
+        'при каждом запуске.'
+    )
@@ -1,7 +1,19 @@
+import asyncio
+import csv
+import io
 import time
 from datetime import datetime
 
+import httpx
 import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import Messages, settings
+from app.main import app
+from app.models import CharityProject
+from app.services.response_cache import response_cache
+from app.services.validators import check_charity_project_name_unique
 
 PROJECTS_URL = '/charity_project/'
 PROJECT_DETAILS_URL = PROJECTS_URL + '{project_id}'
@@ -728,3 +740,156 @@ def test_get_all_charity_project_not_auth_user(test_client):
         f'пользователя к эндпоинту `{PROJECTS_URL}` возвращается список '
         'существующих проектов.'
     )
+
+
+def test_import_charity_projects(superuser_client, donation,
+                                 small_fully_charity_project):
+    csv_data = (
+        'name,description,full_amount\n'
+        'Imported,Imported project,50\n'
+        '1M$ for ur project,Duplicate,10\n'
+        'Invalid,Negative amount,-1\n'
+    )
+    response = superuser_client.post(
+        PROJECTS_URL + 'import',
+        files={'file': ('projects.csv', csv_data, 'text/csv')},
+    )
+    assert response.status_code == 200, (
+        f'POST-запрос суперпользователя к эндпоинту `{PROJECTS_URL}import` '
+        'должен вернуть ответ со статус-кодом 200.'
+    )
+    data = response.json()
+    assert data['created'] == 1, (
+        'При импорте проектов должны создаваться только корректные строки.'
+    )
+    assert [error['line'] for error in data['errors']] == [3, 4], (
+        'При импорте проектов в отчете должны быть перечислены '
+        'некорректные строки.'
+    )
+    projects = superuser_client.get(PROJECTS_URL).json()
+    imported = [
+        project for project in projects if project['name'] == 'Imported'
+    ]
+    assert imported and imported[0]['fully_invested'], (
+        'После импорта проектов свободные пожертвования должны быть '
+        'распределены.'
+    )
+    assert donation.invested_amount == 50
+
+
+def test_import_charity_projects_malformed_rows(superuser_client):
+    csv_data = (
+        'name,description,full_amount\n'
+        'Imported,Imported project,50\n'
+        'Extra,Extra cell,10,20\n'
+    ).encode() + 'Broken,Не UTF-8,10\n'.encode('cp1251') + (
+        b'Another,Imported project,30\n'
+    )
+    response = superuser_client.post(
+        PROJECTS_URL + 'import',
+        files={'file': ('projects.csv', csv_data, 'text/csv')},
+    )
+    assert response.status_code == 200, (
+        'Некорректные строки файла не должны прерывать импорт проектов.'
+    )
+    data = response.json()
+    assert data['created'] == 2
+    assert [error['line'] for error in data['errors']] == [3, 4], (
+        'Строки с лишними ячейками и строки не в кодировке UTF-8 '
+        'должны попадать в отчет об ошибках импорта.'
+    )
+
+
+def test_import_charity_projects_user(user_client):
+    response = user_client.post(
+        PROJECTS_URL + 'import',
+        files={'file': ('projects.jsonl', '{}', 'application/json')},
+    )
+    assert response.status_code == 403, (
+        'Импорт проектов должен быть доступен только суперпользователю.'
+    )
+
+
+@pytest.mark.usefixtures('charity_project', 'small_fully_charity_project')
+def test_export_charity_projects(superuser_client):
+    response = superuser_client.get(
+        PROJECTS_URL + 'export', params={'format': 'csv'}
+    )
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    assert 'projects.csv' in response.headers['content-disposition']
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert {row['name'] for row in rows} == {
+        'chimichangas4life', '1M$ for ur project'
+    }, 'Выгрузка проектов должна содержать все проекты.'
+
+
+@pytest.mark.usefixtures('charity_project')
+def test_get_all_charity_projects_cached(
+        superuser_client, monkeypatch, statements
+):
+    monkeypatch.setattr(settings, 'response_cache_enabled', True)
+    response_cache.bump()
+    response = superuser_client.get(PROJECTS_URL)
+    etag = response.headers['ETag']
+    assert response.json()[0]['name'] == 'chimichangas4life'
+
+    statements.clear()
+    response = superuser_client.get(
+        PROJECTS_URL, headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 304, (
+        'Если список проектов не изменился, на запрос с `If-None-Match` '
+        'должен возвращаться ответ со статус-кодом 304.'
+    )
+    assert not statements, (
+        'Ответ 304 не должен обращаться к базе данных.'
+    )
+
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'Cached', 'description': 'Cached', 'full_amount': 10,
+    })
+    response = superuser_client.get(
+        PROJECTS_URL, headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 200, (
+        'После изменения проектов кэш списка должен сбрасываться.'
+    )
+    assert response.headers['ETag'] != etag
+    assert len(response.json()) == 2
+
+
+async def test_create_charity_project_same_name_concurrently(
+        superuser_client
+):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url='http://test'
+    ) as client:
+        responses = await asyncio.gather(*(
+            client.post(PROJECTS_URL, json={
+                'name': 'Concurrent',
+                'description': 'Concurrent',
+                'full_amount': 100,
+            })
+            for _ in range(20)
+        ))
+    codes = sorted(response.status_code for response in responses)
+    assert codes == [200] + [400] * 19, (
+        'Из одновременных POST-запросов с одинаковым названием проекта '
+        'успешным должен быть только один.'
+    )
+    assert {
+        response.json()['detail'] for response in responses
+        if response.status_code == 400
+    } == {Messages.PROJECT_NAME_OCCUPIED}
+
+
+async def test_project_name_check_keeps_other_integrity_errors():
+    async with TestingSessionLocal() as session:
+        session.add(CharityProject(
+            name='Invalid', description='Invalid', full_amount=0,
+            invested_amount=0, fully_invested=False,
+        ))
+        with pytest.raises(IntegrityError):
+            async with check_charity_project_name_unique(session):
+                await session.commit()
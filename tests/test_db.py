@@ -1,4 +1,10 @@
-from conftest import BASE_DIR
+import pytest
+from conftest import BASE_DIR, engine
+
+from app.core.config import settings
+from app.core.db import create_engine
+from app.core.pool_metrics import pool_metrics
+from app.services.response_cache import response_cache
 
 
 try:
@@ -38,3 +44,43 @@ def test_check_db_url():
                 'Укажите значение по умолчанию для подключения базы данных '
                 'sqlite '
             )
+
+
+async def test_sqlite_engine_profile(tmp_path):
+    engine = create_engine(f'sqlite+aiosqlite:///{tmp_path / "profile.db"}')
+    try:
+        async with engine.connect() as conn:
+            journal_mode = await conn.exec_driver_sql('PRAGMA journal_mode')
+            busy_timeout = await conn.exec_driver_sql('PRAGMA busy_timeout')
+            assert journal_mode.scalar() == 'wal'
+            assert busy_timeout.scalar() == 5000
+        assert engine.pool.size() == 5
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+def pool_usage(monkeypatch):
+    monkeypatch.setattr(settings, 'pool_metrics_enabled', True)
+    monkeypatch.setattr(settings, 'response_cache_enabled', True)
+    response_cache.bump()
+    pool_metrics.reset()
+    pool_metrics.watch(engine)
+    yield pool_metrics
+    pool_metrics.unwatch(engine)
+
+
+def test_pool_checkouts_per_request(user_client, pool_usage):
+    assert user_client.post(
+        '/donation/', json={'full_amount': -1}
+    ).status_code == 422
+    assert user_client.get('/charity_project/').status_code == 200
+    assert user_client.get('/charity_project/').status_code == 200
+    assert user_client.get('/donation/my').status_code == 200
+    assert pool_usage.stats['requests'] == 4
+    assert pool_usage.stats['checkouts'] == 2, (
+        'Сессия должна брать соединение из пула только при первом запросе '
+        'к базе: отклонённый и закэшированный ответы его не требуют.'
+    )
+    assert pool_usage.stats['requests_with_checkouts'] == 2
+    assert pool_usage.stats['held_seconds'] > 0
@@ -1,10 +1,25 @@
+import csv
+import io
+import json
 import time
 from datetime import datetime
 
 import pytest
+from conftest import TEST_DB, TestingSessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import db
+from app.core.config import Constants, settings
+from app.models import CharityProject, Donation
+from app.schemas.donation import DonationFullDB
+from app.services.investment_func import (InvestmentHandler, InvestmentService,
+                                          resume_pending_allocations)
+from app.services.ledger import open_pool_ledger
 
 DONATIONS_URL = '/donation/'
 DONATON_DETAILS_URL = DONATIONS_URL + '{donation_id}'
+DONATION_STATUS_URL = DONATON_DETAILS_URL + '/status'
 MY_DONATIONS_URL = DONATIONS_URL + 'my'
 
 
@@ -221,3 +236,355 @@ def test_create_donation_check_create_date(user_client):
         'Убедитесь, что при неодновременном создании двух пожертвований '
         'у них отличаются значения в поле `create_date`.'
     )
+
+
+def test_create_donations_bulk(
+        user_client, charity_project_little_invested, charity_project_nunchaku
+):
+    json_data = [
+        {'full_amount': 999000, 'comment': 'First'},
+        {'full_amount': 1000},
+        {'full_amount': 200},
+    ]
+    response = user_client.post(DONATIONS_URL + 'bulk', json=json_data)
+    assert response.status_code == 200, (
+        'Корректный POST-запрос зарегистрированного пользователя к эндпоинту '
+        f'`{DONATIONS_URL}bulk` должен возвращать ответ со статус-кодом 200.'
+    )
+    data = response.json()
+    assert [item['full_amount'] for item in data] == [999000, 1000, 200], (
+        'Ответ на пакетное создание пожертвований должен содержать '
+        'по одному элементу на каждое пожертвование в порядке запроса.'
+    )
+    assert len({item['id'] for item in data}) == 3
+    assert all(
+        {'id', 'full_amount', 'create_date'} <= item.keys() for item in data
+    )
+    assert charity_project_little_invested.fully_invested, (
+        'Пакет пожертвований должен распределяться по открытым проектам '
+        'в порядке их создания.'
+    )
+    assert charity_project_nunchaku.invested_amount == 300, (
+        'Пакет пожертвований должен распределяться по открытым проектам '
+        'в порядке их создания.'
+    )
+
+
+@pytest.mark.parametrize('json_data', [
+    [],
+    [{'full_amount': 10}, {'full_amount': -1}],
+    {'full_amount': 10},
+])
+def test_create_donations_bulk_incorrect(user_client, json_data):
+    response = user_client.post(DONATIONS_URL + 'bulk', json=json_data)
+    assert response.status_code == 422, (
+        'При некорректном теле POST-запроса к эндпоинту '
+        f'`{DONATIONS_URL}bulk` должен вернуться статус-код 422.'
+    )
+
+
+def test_import_donations(superuser_client, charity_project_nunchaku, mixer):
+    partner = mixer.blend('app.models.user.User', email='partner@mail.com')
+    jsonl_data = (
+        '{"full_amount": 100, "comment": "First"}\n'
+        'not a json\n'
+        '\n'
+        '{"full_amount": 200}\n'
+    )
+    response = superuser_client.post(
+        DONATIONS_URL + 'import',
+        params={'format': 'jsonl', 'user_id': partner.id},
+        files={'file': ('donations.txt', jsonl_data, 'text/plain')},
+    )
+    assert response.status_code == 200, (
+        f'POST-запрос суперпользователя к эндпоинту `{DONATIONS_URL}import` '
+        'должен вернуть ответ со статус-кодом 200.'
+    )
+    assert response.json() == {
+        'created': 2,
+        'errors': [{'line': 2, 'detail': 'Row cannot be parsed'}],
+    }, 'Отчет об импорте пожертвований отличается от ожидаемого.'
+    assert charity_project_nunchaku.invested_amount == 300, (
+        'Импортированные пожертвования должны быть распределены '
+        'по открытым проектам.'
+    )
+    donations = superuser_client.get(DONATIONS_URL).json()
+    assert {donation['user_id'] for donation in donations} == {partner.id}, (
+        'Импортированные пожертвования должны принадлежать пользователю '
+        'из параметра `user_id`.'
+    )
+
+
+def test_import_donations_unknown_user(superuser_client):
+    response = superuser_client.post(
+        DONATIONS_URL + 'import',
+        params={'format': 'jsonl', 'user_id': 100},
+        files={'file': ('donations.jsonl', '{"full_amount": 100}\n')},
+    )
+    assert response.status_code == 404, (
+        'Импорт пожертвований для несуществующего пользователя должен '
+        'возвращать ответ со статус-кодом 404.'
+    )
+
+
+def test_create_donation_deferred(
+        user_client, charity_project_nunchaku, monkeypatch
+):
+    monkeypatch.setattr(settings, 'deferred_donation_allocation', True)
+    response = user_client.post(DONATIONS_URL, json={'full_amount': 500})
+    assert response.status_code == 202, (
+        'В режиме отложенного распределения POST-запрос к эндпоинту '
+        f'`{DONATIONS_URL}` должен возвращать ответ со статус-кодом 202.'
+    )
+    donation_id = response.json()['id']
+    response = user_client.get(DONATION_STATUS_URL.format(
+        donation_id=donation_id
+    ))
+    assert response.status_code == 200
+    assert response.json() == {
+        'id': donation_id,
+        'status': 'done',
+        'invested_amount': 500,
+        'fully_invested': True,
+    }, (
+        'После выполнения фоновой задачи пожертвование должно быть '
+        'распределено.'
+    )
+    assert charity_project_nunchaku.invested_amount == 500
+
+
+def test_donation_status_pending(user_client, mixer):
+    donation = mixer.blend(
+        'app.models.donation.Donation',
+        user_id=2,
+        full_amount=100,
+        invested_amount=0,
+        fully_invested=False,
+        allocation_pending=True,
+    )
+    response = user_client.get(DONATION_STATUS_URL.format(
+        donation_id=donation.id
+    ))
+    assert response.json()['status'] == 'pending', (
+        'Пока пожертвование не распределено, его статус должен быть '
+        '`pending`.'
+    )
+
+
+@pytest.mark.usefixtures('another_donation')
+def test_donation_status_of_another_user(user_client):
+    response = user_client.get(DONATION_STATUS_URL.format(donation_id=1))
+    assert response.status_code == 404, (
+        'Статус чужого пожертвования не должен быть доступен пользователю.'
+    )
+
+
+async def test_resume_pending_allocations(mixer, charity_project):
+    mixer.blend(
+        'app.models.donation.Donation',
+        user_id=2,
+        full_amount=100,
+        invested_amount=0,
+        fully_invested=False,
+        allocation_pending=True,
+    )
+    await resume_pending_allocations(TestingSessionLocal)
+    assert charity_project.invested_amount == 100, (
+        'Отложенные пожертвования должны распределяться при перезапуске.'
+    )
+
+
+@pytest.mark.parametrize('mode', ['sql', 'orm', 'ledger'])
+async def test_allocate_pending_donation_once(mode, monkeypatch):
+    monkeypatch.setattr(settings, 'investment_mode', mode)
+    async with TestingSessionLocal() as session:
+        donation = Donation(
+            user_id=2, full_amount=100, invested_amount=0,
+            fully_invested=False, allocation_pending=True,
+        )
+        session.add(donation)
+        await session.commit()
+        await session.refresh(donation)
+        async with TestingSessionLocal() as other_session:
+            first_project = CharityProject(
+                name='first', description='description', full_amount=60,
+                invested_amount=0, fully_invested=False,
+            )
+            other_session.add(first_project)
+            await other_session.commit()
+            await other_session.refresh(first_project)
+            await InvestmentHandler(
+                other_session, mode=mode
+            ).perform_investment(first_project, Donation)
+            other_session.add(CharityProject(
+                name='second', description='description', full_amount=100,
+                invested_amount=0, fully_invested=False,
+            ))
+            await other_session.commit()
+        invest_object = InvestmentService(session)
+        await invest_object.allocate_pending_donation(donation.id)
+        await invest_object.allocate_pending_donation(donation.id)
+        projects = (await session.execute(
+            select(CharityProject.invested_amount).order_by(
+                CharityProject.id
+            )
+        )).scalars().all()
+        await session.refresh(donation)
+    assert projects == [60, 40], (
+        'Отложенное пожертвование должно распределяться один раз '
+        'и только в пределах остатка на момент распределения.'
+    )
+    assert donation.invested_amount == 100
+    assert not donation.allocation_pending
+
+
+async def test_allocate_pending_donation_stale_ledger(monkeypatch):
+    monkeypatch.setattr(settings, 'investment_mode', 'ledger')
+    async with TestingSessionLocal() as session:
+        projects = [
+            CharityProject(
+                name=name, description='description', full_amount=100,
+                invested_amount=0, fully_invested=False,
+            )
+            for name in ('first', 'second')
+        ]
+        session.add_all(projects)
+        await session.commit()
+        await open_pool_ledger.rebuild(session)
+        projects[0].invested_amount = 100
+        projects[0].fully_invested = True
+        donation = Donation(
+            user_id=2, full_amount=150, invested_amount=0,
+            fully_invested=False, allocation_pending=True,
+        )
+        session.add(donation)
+        await session.commit()
+        await session.refresh(donation)
+        await InvestmentService(session).allocate_pending_donation(
+            donation.id
+        )
+        await session.refresh(donation)
+    assert donation.invested_amount == 100
+    assert not donation.allocation_pending, (
+        'Если журнал открытых объектов устарел и распределение повторено, '
+        'отложенное пожертвование всё равно должно считаться '
+        'распределённым.'
+    )
+
+
+def test_my_donations_pages(user_client, mixer):
+    for day in (3, 1, 2, 2, 5):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=2,
+            full_amount=100,
+            create_date=datetime(2020, 1, day),
+        )
+    mixer.blend('app.models.donation.Donation', user_id=1, full_amount=100)
+    everything = user_client.get(MY_DONATIONS_URL, params={'paginate': False})
+    expected = [
+        donation['id'] for donation in sorted(
+            everything.json(),
+            key=lambda donation: (donation['create_date'], donation['id'])
+        )
+    ]
+    assert len(expected) == 5
+
+    ids, params = [], {'limit': 2}
+    while True:
+        response = user_client.get(MY_DONATIONS_URL, params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        ids.extend(donation['id'] for donation in response.json())
+        if 'X-Next-Cursor' not in response.headers:
+            break
+        assert 'rel="next"' in response.headers['Link']
+        params['cursor'] = response.headers['X-Next-Cursor']
+    assert ids == expected, (
+        'Страницы списка пожертвований должны идти по порядку создания '
+        'без пропусков и повторов.'
+    )
+
+
+def test_my_donations_invalid_cursor(user_client):
+    response = user_client.get(MY_DONATIONS_URL, params={'cursor': 'broken'})
+    assert response.status_code == 400
+
+
+@pytest.mark.usefixtures('donation', 'another_donation')
+def test_export_donations(superuser_client):
+    response = superuser_client.get(DONATIONS_URL + 'export')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row['full_amount'] for row in rows] == [100, 2000], (
+        'Выгрузка пожертвований должна содержать все пожертвования '
+        'в порядке создания.'
+    )
+    assert rows[0]['create_date'] == '2011-11-11T00:00:00'
+
+    response = superuser_client.get(
+        DONATIONS_URL + 'export', params={'format': 'csv'}
+    )
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row['user_id'] for row in rows] == ['2', '1']
+
+
+def test_export_donations_user(user_client):
+    response = user_client.get(DONATIONS_URL + 'export')
+    assert response.status_code == 403
+
+
+@pytest.mark.usefixtures('donation', 'another_donation')
+def test_get_all_donations_matches_schema(superuser_client):
+    response = superuser_client.get(DONATIONS_URL)
+    assert response.status_code == 200
+    for item in response.json():
+        expected = DonationFullDB.parse_obj(item).dict(exclude_none=True)
+        assert set(item) == set(expected), (
+            'Элементы списка пожертвований должны содержать поля '
+            '`DonationFullDB` без пустых значений.'
+        )
+
+
+@pytest.fixture
+def read_replica(monkeypatch):
+    """The test database opened read-only stands in for a replica."""
+    replica = db.create_engine(
+        f'sqlite+aiosqlite:///{TEST_DB}', read_only=True
+    )
+    sessions = []
+
+    def read_session_factory():
+        sessions.append(AsyncSession(replica))
+        return sessions[-1]
+
+    monkeypatch.setattr(db, 'AsyncReadSessionLocal', read_session_factory)
+    yield sessions
+    replica.sync_engine.dispose()
+
+
+@pytest.mark.usefixtures('donation')
+def test_my_donations_read_replica(user_client, read_replica):
+    response = user_client.get(MY_DONATIONS_URL)
+    assert response.status_code == 200
+    assert [donation['full_amount'] for donation in response.json()] == [100]
+    assert len(read_replica) == 1, (
+        'Список пожертвований пользователя должен читаться с реплики.'
+    )
+
+    response = user_client.post(DONATIONS_URL, json={'full_amount': 10})
+    assert response.status_code == 200
+    assert Constants.READ_PRIMARY_COOKIE in response.cookies
+    response = user_client.get(MY_DONATIONS_URL)
+    assert [donation['full_amount'] for donation in response.json()] == [
+        100, 10
+    ]
+    assert len(read_replica) == 1, (
+        'После записи пользователь должен читать свои данные с основной '
+        'базы, пока реплика может отставать.'
+    )
+
+    user_client.cookies.clear()
+    user_client.get(MY_DONATIONS_URL)
+    assert len(read_replica) == 2
@@ -0,0 +1,111 @@
+import json
+import logging
+import subprocess
+import sys
+from datetime import datetime
+
+from aiogoogle import Aiogoogle
+from aiogoogle.resource import GoogleAPI
+from conftest import BASE_DIR, TestingSessionLocal
+from fixtures.google import sheets_document
+
+from app.core.aiogoogle_client import PersistentAiogoogle
+from app.core.google_client import get_service
+from app.services.google_api import create_report
+from benchmarks.import_time import LAZY_MODULES
+
+
+def test_app_import_skips_google_client():
+    loaded = subprocess.run(
+        [
+            sys.executable, '-c',
+            'import sys, app.main; '
+            'print(*sorted({name.split(".")[0] for name in sys.modules}))'
+        ],
+        capture_output=True, text=True, check=True, cwd=BASE_DIR
+    ).stdout.split()
+    eager = set(LAZY_MODULES) & set(loaded)
+    assert not eager, (
+        f'Импорт приложения не должен загружать {", ".join(sorted(eager))}: '
+        'клиент Google нужен только для отчёта.'
+    )
+
+
+async def test_google_client_reuses_token_and_discovery(
+        fake_google, monkeypatch
+):
+    async def discover(*args, **kwargs):
+        raise AssertionError('discovery document requested')
+
+    monkeypatch.setattr(Aiogoogle, 'discover', discover)
+    for _ in range(2):
+        wrapper_services = await get_service()
+        async with TestingSessionLocal() as session:
+            await create_report(session, wrapper_services)
+    assert await get_service() is wrapper_services
+    assert fake_google.count('POST', '/token') == 1, (
+        'Токен сервисного аккаунта должен запрашиваться один раз, '
+        'пока не истечёт.'
+    )
+    assert len(fake_google.requests) == 1 + 2 * 2
+
+
+async def test_discovery_document_cached_on_disk(tmp_path, monkeypatch):
+    documents = []
+
+    async def discover(self, api_name, api_version=None, validate=False):
+        documents.append((api_name, api_version))
+        return GoogleAPI(sheets_document('http://sheets/'), validate)
+
+    monkeypatch.setattr(Aiogoogle, 'discover', discover)
+    first = PersistentAiogoogle(discovery_dir=str(tmp_path))
+    await first.discover('sheets', 'v4')
+    await first.discover('sheets', 'v4')
+    second = PersistentAiogoogle(discovery_dir=str(tmp_path))
+    api = await second.discover('sheets', 'v4')
+    assert documents == [('sheets', 'v4')]
+    assert api['rootUrl'] == 'http://sheets/'
+
+
+async def test_report_request_count(fake_google, mixer, caplog):
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='=HYPERLINK("http://chimichangas")',
+        description='Huge fan of chimichangas',
+        full_amount=100,
+        invested_amount=100,
+        fully_invested=True,
+        create_date=datetime(2010, 10, 10),
+        close_date=datetime(2010, 10, 11),
+        collection_seconds=24 * 60 * 60,
+    )
+    caplog.set_level(logging.INFO)
+    async with TestingSessionLocal() as session:
+        spreadsheet_id = await create_report(session, await get_service())
+    assert spreadsheet_id == 'sheet'
+    assert [
+        (method, path) for method, path, _ in fake_google.requests
+    ] == [
+        ('POST', '/token'),
+        ('POST', '/v4/spreadsheets'),
+        ('POST', '/drive/v3/files/sheet/permissions'),
+    ], (
+        'Отчёт должен создаваться одним запросом вместе со значениями и '
+        'форматированием, затем выдаются права доступа.'
+    )
+    rows = json.loads(fake_google.requests[1][2])['sheets'][0]['data'][0][
+        'rowData'
+    ]
+    assert len(rows) == 4
+    assert rows[3]['values'][0]['userEnteredValue'] == {
+        'stringValue': '=HYPERLINK("http://chimichangas")'
+    }
+    assert rows[3]['values'][1]['userEnteredValue'] == {
+        'stringValue': '1 day, 0:00:00'
+    }
+    assert rows[2]['values'][0]['userEnteredFormat']['textFormat']['bold']
+    stages = [
+        record.args[0] for record in caplog.records
+        if record.msg.startswith('Google report')
+    ]
+    assert stages == ['projects', 'spreadsheet', 'permissions']
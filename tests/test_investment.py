@@ -1,4 +1,21 @@
+import asyncio
+import math
+import random
+from datetime import datetime, timedelta
+
 import pytest
+from conftest import Base, TestingSessionLocal, engine
+from sqlalchemy import event, func, select
+
+from app.core.config import Constants
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation, Investment
+from app.services.allocation_kernel import close_times, fifo_allocate
+from app.services.allocation_record import AllocationRecord
+from app.services.allocation_worker import AllocationWorker
+from app.services.investment_func import InvestmentHandler
+from app.services.ledger import open_pool_ledger
 
 DONATION_URL = '/donation/'
 PROJECTS_URL = '/charity_project/'
@@ -60,3 +77,483 @@ def test_donation_to_little_invest_project(
     )
     assert not charity_project_nunchaku.fully_invested, common_asser_msg
     assert charity_project_nunchaku.invested_amount == 0, common_asser_msg
+
+
+async def _replay_allocation(mode, projects, donations):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    start = datetime(2010, 10, 10)
+    events = sorted(
+        [(day, CharityProject, amount) for day, amount in projects] +
+        [(day, Donation, amount) for day, amount in donations],
+        key=lambda event: event[0]
+    )
+    async with TestingSessionLocal() as session:
+        await open_pool_ledger.rebuild(session)
+        handler = InvestmentHandler(session, mode=mode)
+        for number, (day, model, amount) in enumerate(events):
+            obj = model(
+                full_amount=amount,
+                invested_amount=0,
+                fully_invested=False,
+                create_date=start + timedelta(days=day),
+            )
+            if model is CharityProject:
+                obj.name = f'project {number}'
+                obj.description = 'description'
+            else:
+                obj.user_id = 1
+            session.add(obj)
+            await session.commit()
+            await session.refresh(obj)
+            await handler.perform_investment(
+                obj, Donation if model is CharityProject else CharityProject
+            )
+        state = []
+        for model in (CharityProject, Donation):
+            rows = await session.execute(
+                select(
+                    model.id, model.invested_amount, model.fully_invested
+                ).order_by(model.id)
+            )
+            state.append(rows.all())
+        transfers = await session.execute(
+            select(
+                Investment.donation_id, Investment.project_id,
+                Investment.amount
+            ).order_by(Investment.donation_id, Investment.project_id)
+        )
+        state.append(transfers.all())
+    return state
+
+
+@pytest.mark.parametrize('mode', ['sql', 'ledger'])
+@pytest.mark.parametrize('seed', range(5))
+async def test_allocation_matches_reference(mode, seed):
+    rnd = random.Random(seed)
+    projects = [(rnd.randint(0, 30), rnd.randint(1, 1000)) for _ in range(15)]
+    donations = [(rnd.randint(0, 30), rnd.randint(1, 700)) for _ in range(25)]
+    expected = await _replay_allocation('orm', projects, donations)
+    assert await _replay_allocation(mode, projects, donations) == expected, (
+        f'Распределение средств в режиме `{mode}` должно совпадать '
+        'с эталонным распределением в режиме `orm`.'
+    )
+    projects_state, donations_state, transfers = expected
+    for model_state, column in ((projects_state, 1), (donations_state, 0)):
+        for obj_id, invested_amount, _ in model_state:
+            assert invested_amount == sum(
+                transfer[2] for transfer in transfers
+                if transfer[column] == obj_id
+            ), (
+                'Сумма переводов в журнале инвестиций должна совпадать '
+                'с инвестированной суммой объекта.'
+            )
+
+
+@pytest.mark.parametrize('mode', ['sql', 'orm', 'ledger'])
+async def test_collection_seconds_on_close(mode):
+    start = datetime.now() - timedelta(days=10)
+    async with TestingSessionLocal() as session:
+        projects = [
+            CharityProject(
+                name=f'project {days}', description='description',
+                full_amount=100, invested_amount=0, fully_invested=False,
+                create_date=start + timedelta(days=days),
+            )
+            for days in (0, 5, 2)
+        ]
+        session.add_all(projects)
+        await session.commit()
+        await open_pool_ledger.rebuild(session)
+        handler = InvestmentHandler(session, mode=mode)
+        for amount in (150, 150):
+            donation = Donation(
+                user_id=1, full_amount=amount, invested_amount=0,
+                fully_invested=False,
+            )
+            session.add(donation)
+            await session.commit()
+            await session.refresh(donation)
+            await handler.perform_investment(donation, CharityProject)
+
+        for model in (CharityProject, Donation):
+            for obj in (await session.execute(select(model))).scalars():
+                await session.refresh(obj)
+                expected = None
+                if obj.fully_invested:
+                    expected = int(
+                        (obj.close_date - obj.create_date).total_seconds()
+                    )
+                assert obj.collection_seconds == expected, (
+                    'При закрытии объекта должно сохраняться время сбора '
+                    'в поле `collection_seconds`.'
+                )
+
+        report = await charity_project_crud.get_projects_by_completion_rate(
+            session
+        )
+    assert [project.name for project in report] == [
+        'project 5', 'project 2', 'project 0'
+    ], (
+        'Отчёт должен упорядочивать закрытые проекты по времени сбора.'
+    )
+
+
+async def test_reference_allocation_stops_when_invested(statements):
+    async with TestingSessionLocal() as session:
+        session.add_all([
+            Donation(
+                user_id=1,
+                full_amount=100,
+                invested_amount=0,
+                fully_invested=False,
+                create_date=datetime(2010, 10, 10) + timedelta(minutes=number),
+            )
+            for number in range(Constants.INVESTMENT_BATCH_SIZE * 4)
+        ])
+        project = CharityProject(
+            name='project', description='description', full_amount=150,
+            invested_amount=0, fully_invested=False,
+        )
+        session.add(project)
+        await session.commit()
+        await session.refresh(project)
+
+        statements.clear()
+        project = await InvestmentHandler(
+            session, mode='orm'
+        ).perform_investment(project, Donation)
+
+    assert project.fully_invested, (
+        'Проект должен быть закрыт двумя первыми пожертвованиями.'
+    )
+    donation_selects = [
+        statement for statement in statements
+        if statement.lstrip().upper().startswith('SELECT') and
+        'FROM donation' in statement
+    ]
+    assert len(donation_selects) == 1, (
+        'Если объект полностью инвестирован, чтение открытых объектов '
+        'из базы данных должно прекращаться.'
+    )
+
+
+async def test_running_totals_read_in_batches(statements):
+    async with TestingSessionLocal() as session:
+        session.add_all([
+            Donation(user_id=1, full_amount=100, invested_amount=0,
+                     fully_invested=False,
+                     create_date=datetime(2010, 10, 10, hour))
+            for hour in range(5)
+        ])
+        await session.commit()
+
+        statements.clear()
+        first_batch = await donation_crud.get_open_running_totals(
+            150, session, limit=2
+        )
+        first_batch_selects = len(statements)
+        rows = await donation_crud.get_open_running_totals(
+            350, session, limit=2
+        )
+
+    assert [row.id for row in first_batch] == [1, 2]
+    assert first_batch_selects == 1, (
+        'Если сумма покрыта первой страницей открытых объектов, '
+        'следующие страницы читаться не должны.'
+    )
+    assert [row.allocated_before for row in rows] == [0, 100, 200, 300], (
+        'Нарастающий итог должен продолжаться между страницами '
+        'открытых объектов.'
+    )
+
+
+async def test_ledger_allocation_recovers_from_stale_ledger():
+    async with TestingSessionLocal() as session:
+        session.add_all([
+            Donation(user_id=1, full_amount=100, invested_amount=0,
+                     fully_invested=False,
+                     create_date=datetime(2010, 10, 10, hour))
+            for hour in range(3)
+        ])
+        await session.commit()
+        await open_pool_ledger.rebuild(session)
+        first_donation = await session.get(Donation, 1)
+        first_donation.invested_amount = 100
+        first_donation.fully_invested = True
+        project = CharityProject(
+            name='project', description='description', full_amount=150,
+            invested_amount=0, fully_invested=False,
+        )
+        session.add(project)
+        await session.commit()
+        await session.refresh(project)
+        project = await InvestmentHandler(
+            session, mode='ledger'
+        ).perform_investment(project, Donation)
+        donations = (await session.execute(
+            select(Donation.invested_amount).order_by(Donation.id)
+        )).scalars().all()
+    assert project.fully_invested
+    assert donations == [100, 100, 50], (
+        'Если данные в базе изменились в обход журнала открытых объектов, '
+        'журнал должен быть перестроен, а распределение - повторено.'
+    )
+
+
+async def test_allocation_worker_group_commit():
+    async with TestingSessionLocal() as session:
+        session.add(CharityProject(
+            name='project', description='description', full_amount=1000,
+            invested_amount=0, fully_invested=False,
+        ))
+        donations = [
+            Donation(user_id=1, full_amount=30, invested_amount=0,
+                     fully_invested=False)
+            for _ in range(40)
+        ]
+        session.add_all(donations)
+        await session.flush()
+        donation_ids = [donation.id for donation in donations]
+        await session.commit()
+
+    commits = []
+
+    def count_commits(conn):
+        commits.append(conn)
+
+    worker = AllocationWorker(session_factory=TestingSessionLocal)
+    await worker.start()
+    event.listen(engine.sync_engine, 'commit', count_commits)
+    try:
+        await asyncio.gather(*[
+            worker.submit(
+                lambda session, donation_id=donation_id: InvestmentHandler(
+                    session
+                ).allocate_committed(Donation, donation_id)
+            )
+            for donation_id in donation_ids
+        ])
+    finally:
+        event.remove(engine.sync_engine, 'commit', count_commits)
+        await worker.stop()
+
+    async with TestingSessionLocal() as session:
+        project = await session.get(CharityProject, 1)
+        invested = (await session.execute(
+            select(func.sum(Donation.invested_amount))
+        )).scalar()
+    assert project.invested_amount == invested == 1000, (
+        'При параллельном распределении пожертвований через очередь '
+        'суммы проекта и пожертвований должны сходиться.'
+    )
+    assert project.fully_invested
+    assert len(commits) < len(donation_ids), (
+        'Распределения из очереди должны фиксироваться пакетами.'
+    )
+
+
+async def test_allocation_worker_isolates_failed_job():
+    async with TestingSessionLocal() as session:
+        session.add(CharityProject(
+            name='project', description='description', full_amount=1000,
+            invested_amount=0, fully_invested=False,
+        ))
+        donations = [
+            Donation(user_id=1, full_amount=30, invested_amount=0,
+                     fully_invested=False)
+            for _ in range(4)
+        ]
+        session.add_all(donations)
+        await session.flush()
+        donation_ids = [donation.id for donation in donations]
+        await session.commit()
+
+    async def fail(session):
+        await InvestmentHandler(session).allocate_committed(
+            Donation, donation_ids[0]
+        )
+        raise ValueError('allocation failed')
+
+    worker = AllocationWorker(session_factory=TestingSessionLocal)
+    await worker.start()
+    try:
+        results = await asyncio.gather(
+            worker.submit(fail),
+            *[
+                worker.submit(
+                    lambda session, donation_id=donation_id: (
+                        InvestmentHandler(session).allocate_committed(
+                            Donation, donation_id
+                        )
+                    )
+                )
+                for donation_id in donation_ids[1:]
+            ],
+            return_exceptions=True
+        )
+    finally:
+        await worker.stop()
+
+    async with TestingSessionLocal() as session:
+        invested = (await session.execute(
+            select(Donation.invested_amount).order_by(Donation.id)
+        )).scalars().all()
+    assert isinstance(results[0], ValueError)
+    assert results[1:] == [None] * 3, (
+        'Ошибка одного распределения из очереди не должна отменять '
+        'остальные распределения пакета.'
+    )
+    assert invested == [0, 30, 30, 30]
+
+
+def test_donation_investments(
+        user_client, charity_project, charity_project_nunchaku
+):
+    donation_id = user_client.post(
+        DONATION_URL, json={'full_amount': 1000500}
+    ).json()['id']
+    response = user_client.get(f'{DONATION_URL}{donation_id}/investments')
+    assert response.status_code == 200, (
+        'GET-запрос владельца пожертвования к журналу его инвестиций '
+        'должен вернуть ответ со статус-кодом 200.'
+    )
+    assert [
+        (item['project_id'], item['amount']) for item in response.json()
+    ] == [(charity_project.id, 1000000), (charity_project_nunchaku.id, 500)], (
+        'Журнал инвестиций пожертвования должен содержать все переводы '
+        'в проекты в порядке распределения.'
+    )
+    response = user_client.get(
+        f'{PROJECTS_URL}{charity_project_nunchaku.id}/investments'
+    )
+    assert response.status_code == 403, (
+        'Журнал инвестиций проекта должен быть доступен только '
+        'суперпользователю.'
+    )
+
+
+def test_charity_project_investments(superuser_client, donation):
+    project_id = superuser_client.post(PROJECTS_URL, json={
+        'name': 'Project', 'description': 'Description', 'full_amount': 60,
+    }).json()['id']
+    response = superuser_client.get(f'{PROJECTS_URL}{project_id}/investments')
+    assert response.status_code == 200
+    assert [
+        (item['donation_id'], item['amount']) for item in response.json()
+    ] == [(donation.id, 60)], (
+        'Журнал инвестиций проекта должен содержать переводы '
+        'из пожертвований.'
+    )
+
+
+@pytest.mark.parametrize('seed', range(5))
+async def test_allocation_kernel_matches_reference(seed):
+    rnd = random.Random(seed)
+    projects = [(rnd.randint(0, 30), rnd.randint(1, 1000)) for _ in range(15)]
+    donations = [(rnd.randint(0, 30), rnd.randint(1, 700)) for _ in range(25)]
+    projects_state, donations_state, transfers = await _replay_allocation(
+        'orm', projects, donations
+    )
+    allocation = fifo_allocate(
+        [amount for _, amount in sorted(donations, key=lambda x: x[0])],
+        [amount for _, amount in sorted(projects, key=lambda x: x[0])],
+    )
+    assert allocation.project_invested.tolist() == [
+        invested_amount for _, invested_amount, _ in projects_state
+    ], 'Векторное распределение должно совпадать с `distribute()`.'
+    assert allocation.donation_invested.tolist() == [
+        invested_amount for _, invested_amount, _ in donations_state
+    ], 'Векторное распределение должно совпадать с `distribute()`.'
+    assert sorted(zip(
+        (allocation.donation_index + 1).tolist(),
+        (allocation.project_index + 1).tolist(),
+        allocation.amount.tolist(),
+    )) == sorted(transfers), (
+        'Переводы векторного распределения должны совпадать с журналом '
+        'инвестиций `distribute()`.'
+    )
+
+
+async def test_allocation_kernel_on_fixtures(
+        charity_project_little_invested, charity_project_nunchaku,
+        donation, another_donation
+):
+    async with TestingSessionLocal() as session:
+        remainders = []
+        for model in (Donation, CharityProject):
+            rows = await session.execute(
+                select(model.full_amount - model.invested_amount).order_by(
+                    model.create_date, model.id
+                )
+            )
+            remainders.append(rows.scalars().all())
+        allocation = fifo_allocate(*remainders)
+        await InvestmentHandler(session).allocate_open_pools()
+        await session.commit()
+    assert allocation.project_invested.tolist() == [
+        charity_project_little_invested.invested_amount - 100,
+        charity_project_nunchaku.invested_amount,
+    ]
+    assert allocation.donation_invested.tolist() == [
+        donation.invested_amount, another_donation.invested_amount
+    ]
+
+
+@pytest.mark.parametrize('donations, projects', [
+    ([], [100]),
+    ([100], []),
+    ([], []),
+])
+def test_allocation_kernel_empty_pool(donations, projects):
+    allocation = fifo_allocate(donations, projects)
+    assert allocation.amount.tolist() == [], (
+        'Если один из пулов пуст, переводов быть не должно.'
+    )
+    assert allocation.donation_index.tolist() == []
+    assert allocation.project_index.tolist() == []
+    assert allocation.donation_invested.tolist() == [0] * len(donations)
+    assert allocation.project_invested.tolist() == [0] * len(projects)
+
+
+def test_allocation_kernel_close_times():
+    closed = close_times([100, 50, 500], [0, 1, 2], [120, 40], [5, 10])
+    assert closed[:2].tolist() == [5, 10], (
+        'Проект закрывается с поступлением пожертвования, '
+        'покрывающего его последнюю единицу.'
+    )
+    assert math.isnan(closed[2])
+
+
+@pytest.mark.parametrize('recipient_amount, closed', [
+    (1000, (False, True)),
+    (300, (True, True)),
+    (200, (True, False)),
+])
+def test_distribute_records(recipient_amount, closed):
+    handler = InvestmentHandler(session=None)
+    recipient = AllocationRecord(1, recipient_amount, 0)
+    source = AllocationRecord(2, 500, 200)
+    amount = handler.distribute(recipient, source)
+    assert amount == min(recipient_amount, 300)
+    assert recipient.invested_amount == amount
+    assert source.invested_amount == 200 + amount
+    assert (recipient.fully_invested, source.fully_invested) == closed, (
+        'Распределение должно закрывать объект, '
+        'сумма которого внесена полностью.'
+    )
+    for record, is_closed in zip((recipient, source), closed):
+        assert (record.close_date is not None) == is_closed
+
+
+def test_allocation_record_apply_to():
+    project = CharityProject(
+        name='Record', description='Record', full_amount=100,
+        invested_amount=0, fully_invested=False
+    )
+    record = InvestmentHandler.close_entity(AllocationRecord(1, 100, 40))
+    record.apply_to(project)
+    assert project.invested_amount == 100
+    assert project.fully_invested
+    assert project.close_date == record.close_date
@@ -0,0 +1,116 @@
+import re
+from datetime import datetime
+
+import pytest
+from conftest import TestingSessionLocal, engine
+from sqlalchemy import event
+
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.crud.investment import investment_crud
+from app.models import User
+
+FULL_SCAN = re.compile(r'^SCAN (charityproject|donation|investment|user)\b')
+
+UPDATE_ROW = {
+    'row_id': 1,
+    'new_invested_amount': 10,
+    'new_fully_invested': False,
+    'new_close_date': None,
+    'new_collection_seconds': None,
+}
+REMAINDER_ROW = {
+    'row_id': 1,
+    'old_remainder': 100,
+    'new_remainder': 90,
+    'new_fully_invested': False,
+    'new_close_date': None,
+    'new_collection_seconds': None,
+}
+AFTER_ROW = type('AfterRow', (), {'id': 1, 'create_date': datetime.now()})
+
+# `get_multi` and `get_fifo_history` read whole tables by design, the first
+# list page reads the `create_date` index in order up to its limit.
+CRUD_QUERIES = {
+    'get': lambda session: charity_project_crud.get(1, session),
+    'get_all_open': charity_project_crud.get_all_open,
+    'get_open_batch': charity_project_crud.get_open_batch,
+    'get_open_batch_after': lambda session: donation_crud.get_open_batch(
+        session, after=AFTER_ROW
+    ),
+    'get_open_running_totals': lambda session: (
+        donation_crud.get_open_running_totals(100, session)
+    ),
+    'bulk_update_investment': lambda session: (
+        charity_project_crud.bulk_update_investment([UPDATE_ROW], session)
+    ),
+    'bulk_update_remainders': lambda session: (
+        donation_crud.bulk_update_remainders([REMAINDER_ROW], session)
+    ),
+    'get_occupied_names': lambda session: (
+        charity_project_crud.get_occupied_names(['name'], session)
+    ),
+    'get_projects_by_completion_rate': (
+        charity_project_crud.get_projects_by_completion_rate
+    ),
+    'get_page_after': lambda session: donation_crud.get_page(
+        session, 10, AFTER_ROW
+    ),
+    'get_user_donations_page': lambda session: (
+        donation_crud.get_user_donations_page(
+            session, User(id=1), 10, AFTER_ROW
+        )
+    ),
+    'get_user_donations': lambda session: (
+        donation_crud.get_user_donations(session, User(id=1))
+    ),
+    'get_pending_ids': donation_crud.get_pending_ids,
+    'get_donation_investments': lambda session: (
+        investment_crud.get_donation_investments(1, session)
+    ),
+    'get_project_investments': lambda session: (
+        investment_crud.get_project_investments(1, session)
+    ),
+}
+
+
+async def capture_statements(query) -> list[tuple[str, tuple]]:
+    statements = []
+
+    def before_cursor_execute(
+            conn, cursor, statement, parameters, context, executemany
+    ):
+        statements.append(
+            (statement, parameters[0] if executemany else parameters)
+        )
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+    try:
+        async with TestingSessionLocal() as session:
+            await query(session)
+            await session.rollback()
+    finally:
+        event.remove(
+            engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+        )
+    return statements
+
+
+@pytest.mark.parametrize('name', CRUD_QUERIES)
+async def test_crud_query_uses_index(name):
+    statements = await capture_statements(CRUD_QUERIES[name])
+    assert statements
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = await conn.exec_driver_sql(
+                f'EXPLAIN QUERY PLAN {statement}', parameters
+            )
+            scans = [
+                row.detail for row in plan if FULL_SCAN.match(row.detail)
+            ]
+            assert not scans, (
+                f'Запрос `{name}` читает таблицу целиком: {scans}\n'
+                f'{statement}'
+            )